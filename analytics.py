@@ -0,0 +1,333 @@
+"""
+Cross-asset returns, rolling correlations, betas and volatility.
+
+aligned_changes() puts the sources onto one business-day calendar:
+
+  prices      daily log returns (%) of the price panel's closes
+  yields      daily changes (bp) of the Treasury par yields
+  OAS         daily changes (bp) of the credit spreads
+
+Assets trade on different days (FX on US holidays, foreign indices on their own
+calendars), so gaps stay missing and every statistic is pairwise-complete. The
+FRED frames must therefore come unfilled (filled=False): a forward-filled
+holiday would enter as a 0 bp change.
+RollingCorrelation keeps window sums for all pairs at once, with X the changes
+(gaps as 0) and M the presence mask (window x assets):
+
+  n   = Mᵀ M       days on which both are present
+  sx  = Xᵀ M       sum of i over the days j is present
+  sxx = (X²)ᵀ M    sum of squares of i over those days
+  sxy = Xᵀ X       sum of products
+
+Correlations, covariances, betas and volatilities are element-wise arithmetic on
+these. A new day only adds its rank-one terms (and subtracts those of the day
+leaving the window); a revised last day is retracted and pushed again.
+"""
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from rolling import REVISION_CHECK_ROWS
+
+# Rolling windows offered in the app (business days)
+CORRELATION_WINDOWS = {"1M": 21, "3M": 63, "6M": 126}
+
+# Trading days per year (annualizes volatility)
+PERIODS_PER_YEAR = 252
+
+# Betas and correlations in the stats table are measured against this ticker
+BENCHMARK = "^GSPC"
+
+# Display names and group of the FRED sources
+YIELD_GROUP = "Treasuries"
+OAS_GROUP = "Credit OAS"
+OAS_LABELS = {
+    "High Yield (Junk)": "HY OAS",
+    "BBB Corp (Inv. Grade)": "BBB OAS",
+    "AAA Corp (Prime)": "AAA OAS",
+}
+
+# The default "Cross-asset" view: the first instruments of each universe group, plus these
+CROSS_ASSET_PER_GROUP = 2
+CROSS_ASSET_YIELDS = ["US2Y", "US10Y", "US30Y"]
+
+# Engines kept for different window lengths
+MAX_ENGINES = 4
+
+
+def _labels(universe):
+    """
+    ticker -> display name, made unique with the ticker where names collide.
+    """
+    names = universe.set_index("ticker")["name"]
+    duplicated = names.duplicated(keep=False)
+    return {
+        ticker: f"{name} ({ticker})" if dup else name
+        for (ticker, name), dup in zip(names.items(), duplicated)
+    }
+
+
+def aligned_changes(panel, universe, yields, credit):
+    """
+    Daily changes of every source on one business-day calendar (the price panel's
+    span). Returns (changes, info): info has each column's group, unit and ticker.
+    """
+    if panel.empty:
+        return pd.DataFrame(), pd.DataFrame(columns=["group", "unit", "ticker"])
+
+    labels = _labels(universe)
+    tickers = [t for t in labels if t in panel["Close"].columns]
+    calendar = pd.bdate_range(panel.index[0], panel.index[-1])
+
+    closes = panel["Close"][tickers]
+    # Each asset's return runs from its previous close, across its own holidays
+    returns = 100 * np.log(closes.ffill()).diff().where(closes.notna())
+
+    def bp_changes(frame):
+        frame = frame[frame.index >= calendar[0] - pd.Timedelta(days=10)]
+        # Like returns: the first print after a gap is measured from the last one before it
+        return (100 * frame.ffill().diff()).where(frame.notna()).reindex(calendar)
+
+    parts = [returns.reindex(calendar).rename(columns=labels)]
+    info = [pd.DataFrame({
+        "group": universe.set_index("ticker").loc[tickers, "group"].to_numpy(),
+        "unit": "%",
+        "ticker": tickers,
+    }, index=[labels[t] for t in tickers])]
+
+    if not yields.empty:
+        parts.append(bp_changes(yields))
+        info.append(pd.DataFrame({"group": YIELD_GROUP, "unit": "bp", "ticker": None}, index=yields.columns))
+    if not credit.empty:
+        oas = credit.rename(columns=OAS_LABELS)
+        parts.append(bp_changes(oas))
+        info.append(pd.DataFrame({"group": OAS_GROUP, "unit": "bp", "ticker": None}, index=oas.columns))
+
+    changes = pd.concat(parts, axis=1).astype("float64")
+    # Leading rows have no change yet (first close of the panel)
+    return changes.dropna(how="all"), pd.concat(info)
+
+
+class RollingCorrelation:
+    """
+    Pairwise-complete rolling window sums for every column pair of a growing
+    time-indexed frame. update(df) returns a WindowStats for the last `window` rows.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.processed = None
+        # The window plus the rows that left it recently, so revised rows can be retracted
+        self.rows = deque(maxlen=self.window + REVISION_CHECK_ROWS)
+        self._pushes = 0
+
+    def _resum(self):
+        active = list(self.rows)[-self.window:]
+        x = np.array([row for row, _ in active])
+        m = np.array([mask for _, mask in active])
+        self.n = m.T @ m
+        self.sx = x.T @ m
+        self.sxx = (x * x).T @ m
+        self.sxy = x.T @ x
+        self._pushes = 0
+
+    def _add(self, x, m, sign):
+        # Rows x / masks m (one per row) enter (+1) or leave (-1) the window
+        self.n += sign * (m.T @ m)
+        self.sx += sign * (x.T @ m)
+        self.sxx += sign * ((x * x).T @ m)
+        self.sxy += sign * (x.T @ x)
+
+    def _push(self, x, m):
+        """
+        Appends rows (2-D blocks) in one batch of matrix products.
+        """
+        if len(x) >= self.window:
+            self.rows.extend(zip(x, m))
+            self._resum()
+            return
+
+        active = list(self.rows)[-self.window:]
+        leaving = active[:max(len(active) + len(x) - self.window, 0)]
+        if leaving:
+            self._add(np.array([r for r, _ in leaving]), np.array([k for _, k in leaving]), -1)
+        self.rows.extend(zip(x, m))
+        self._add(x, m, 1)
+
+        # Exact sums every `window` pushed rows keep the running sums from drifting
+        self._pushes += len(x)
+        if self._pushes >= self.window:
+            self._resum()
+
+    def _pop(self):
+        x, m = self.rows.pop()
+        self._add(x[None], m[None], -1)
+        if len(self.rows) >= self.window:
+            x, m = self.rows[-self.window]
+            self._add(x[None], m[None], 1)
+
+    def _first_change(self, df):
+        """
+        Position of the first row of `df` that differs from the processed frame,
+        or None if that is further back than the retained rows (rebuild).
+        """
+        seen = self.processed
+        if seen is None or list(df.columns) != list(seen.columns):
+            return None
+        n = len(seen)
+        start = max(n - REVISION_CHECK_ROWS, 0)
+        if start and (len(df) < start or df.index[start - 1] != seen.index[start - 1]):
+            return None
+
+        old = seen.iloc[start:n]
+        new = df.iloc[start:n]
+        same_index = old.index[:len(new)] == new.index
+        same_values = np.isclose(old.to_numpy()[:len(new)], new.to_numpy(), rtol=1e-12, atol=0, equal_nan=True).all(axis=1)
+        differs = np.flatnonzero(~(same_index & same_values))
+        return start + (differs[0] if len(differs) else len(new))
+
+    def _rebuild(self, df):
+        self._reset()
+        self.rows.extend(zip(*_arrays(df.iloc[-(self.window + REVISION_CHECK_ROWS):])))
+        self._resum()
+
+    def update(self, df):
+        with self._lock:
+            if df.empty:
+                self._reset()
+                return None
+
+            first = self._first_change(df)
+            if first is None:
+                self._rebuild(df)
+            elif first == len(df) == len(self.processed):
+                return self.stats
+            else:
+                for _ in range(len(self.processed) - first):
+                    self._pop()
+                if first < len(df):
+                    self._push(*_arrays(df.iloc[first:]))
+            self.processed = df
+            self.stats = WindowStats(list(df.columns), self.n.copy(), self.sx.copy(), self.sxx.copy(), self.sxy.copy(), self.window)
+            return self.stats
+
+
+def _arrays(df):
+    # Changes with gaps as 0, and the presence mask
+    return df.fillna(0).to_numpy(dtype="float64"), df.notna().to_numpy(dtype="float64")
+
+
+class WindowStats:
+    """
+    Correlation, beta and volatility of one window (from RollingCorrelation sums).
+    Pairs with fewer than half a window of common days are NaN.
+    """
+
+    def __init__(self, columns, n, sx, sxx, sxy, window):
+        self.columns = columns
+        self.n, self.sx, self.sxx, self.sxy = n, sx, sxx, sxy
+        self.min_obs = max(window // 2, 2)
+
+    def _pairwise(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = np.where(self.n >= self.min_obs, self.n, np.nan)
+            # Sample covariance and each side's variance over the days both are present
+            cov = (self.sxy - self.sx * self.sx.T / n) / (n - 1)
+            var_i = (self.sxx - self.sx ** 2 / n) / (n - 1)
+        return cov, var_i, var_i.T
+
+    def correlation(self):
+        cov, var_i, var_j = self._pairwise()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.clip(cov / np.sqrt(var_i * var_j), -1, 1)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def volatility(self, periods_per_year=PERIODS_PER_YEAR):
+        _, var_i, _ = self._pairwise()
+        return pd.Series(np.sqrt(np.diag(var_i) * periods_per_year), index=self.columns)
+
+    def betas(self, benchmark):
+        """
+        Beta of every column to `benchmark` (same units ratio as the inputs).
+        """
+        cov, _, var_j = self._pairwise()
+        b = self.columns.index(benchmark)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pd.Series(cov[:, b] / var_j[:, b], index=self.columns)
+
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def correlation_engine(window):
+    """
+    Shared RollingCorrelation for a window length (least recently used beyond MAX_ENGINES dropped).
+    """
+    with _engines_lock:
+        engine = _engines.pop(window, None) or RollingCorrelation(window)
+        _engines[window] = engine
+        while len(_engines) > MAX_ENGINES:
+            _engines.popitem(last=False)
+    return engine
+
+
+def clear_engines():
+    """
+    Forgets all correlation window state.
+    """
+    with _engines_lock:
+        _engines.clear()
+
+
+def correlation_groups(universe):
+    """
+    View options: "Cross-asset", "All", then each group.
+    """
+    return ["Cross-asset", "All", *universe["group"].unique(), YIELD_GROUP, OAS_GROUP]
+
+
+def select_columns(info, group):
+    """
+    Columns shown for a correlation_groups() option.
+    """
+    if group == "All":
+        return list(info.index)
+    if group != "Cross-asset":
+        return list(info.index[info["group"] == group])
+
+    priced = info[info["unit"] == "%"]
+    columns = list(priced.groupby("group", sort=False).head(CROSS_ASSET_PER_GROUP).index)
+    columns += [c for c in CROSS_ASSET_YIELDS if c in info.index]
+    columns += list(info.index[info["group"] == OAS_GROUP])
+    return columns
+
+
+def cross_asset_stats(changes, info, window, group="Cross-asset"):
+    """
+    (correlation matrix, stats table) of the last `window` days for one view. The
+    table has annualized volatility and the beta / correlation to BENCHMARK.
+    """
+    stats = correlation_engine(window).update(changes)
+    if stats is None:
+        return pd.DataFrame(), pd.DataFrame()
+
+    columns = select_columns(info, group)
+    corr = stats.correlation()
+    benchmark_rows = info.index[info["ticker"] == BENCHMARK]
+    benchmark = benchmark_rows[0] if len(benchmark_rows) else changes.columns[0]
+
+    table = pd.DataFrame({
+        "Group": info["group"],
+        "Volatility (ann.)": stats.volatility(),
+        "Unit": info["unit"],
+        f"Beta to {benchmark}": stats.betas(benchmark),
+        f"Corr. to {benchmark}": corr[benchmark],
+    }).loc[columns]
+    return corr.loc[columns, columns], table
@@ -1,10 +1,24 @@
+import contextvars
+import os
+import time
 import streamlit as st
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+from typing import Callable
 
 # Local Imports
-# Ensure you import get_us_credit from data
-from data import get_upcoming_releases, get_us_credit, get_earnings_dates
-from plots import us_treasury_plots, credit_spread_plots, plot_ff, plot_indexes
+import telemetry
+import cache
+import sections
+import snapshot
+from lazy import lazy_import
+
+# Loaded when a section first needs them, so the password prompt renders without
+# pandas, the providers or plotly (see check_imports.py)
+pd = lazy_import("pandas")
+data = lazy_import("data")
+plots = lazy_import("plots")
 
 # --- 1. PAGE CONFIGURATION ---
 st.set_page_config(
@@ -39,183 +53,464 @@ def check_password():
 
 def render_sidebar():
     """
-    Renders the sidebar controls and returns user settings.
+    Renders the sidebar (settings and logout).
     """
     with st.sidebar:
         st.header("⚙️ Settings")
         
-        # Logout
+        # Logout (only this session; cached data stays warm for other users)
         if st.button('🔒 Logout', width="stretch"):
-            st.session_state["password_correct"] = False
-            st.cache_data.clear()
+            st.session_state.clear()
             st.rerun()
-            
+
         st.divider()
-        
-        # Calendar Controls
-        st.subheader("Calendar Options")
-        days_ahead = st.slider("Days Look Ahead", 1, 60, 14)
-        show_important = st.toggle("High Impact Only", value=True)
-        
-    return days_ahead, show_important
 
-def render_earnings_section():
+        # Diagnostics
+        with st.expander("🩺 Diagnostics"):
+            render_diagnostics()
+
+        # Admin
+        if admin_refresh_enabled():
+            with st.expander("🛠️ Refresh Data"):
+                render_admin_refresh()
+
+def admin_refresh_enabled():
+    """
+    The source refresh controls are opt-in: MACRO_ADMIN_REFRESH=1 or `admin_refresh = true` in the secrets.
+    """
+    return os.environ.get("MACRO_ADMIN_REFRESH") == "1" or bool(st.secrets.get("admin_refresh", False))
+
+def render_admin_refresh():
+    """
+    Refreshes or evicts the cached data of a single source, for every user.
+    """
+    source = st.selectbox("Source", cache.namespaces(), key="admin_source")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Refresh", width="stretch", help="Fetch again in the background, serving current data meanwhile"):
+            cache.refresh(source)
+            st.toast(f"Refreshing {source}")
+    with col2:
+        if st.button("Evict", width="stretch", help="Drop the cached data; the next view fetches it again"):
+            cache.evict(source)
+            st.toast(f"Evicted {source}")
+
+def render_diagnostics():
+    """
+    Timings, cache status, bytes, rows and provider errors per loader / plot builder.
+    """
+    rows = telemetry.summary()
+    if not rows:
+        st.caption("No instrumented calls yet.")
+        return
+
+    st.dataframe(
+        pd.DataFrame(rows),
+        column_config={
+            "mean ms": st.column_config.NumberColumn(format="%.1f"),
+            "max ms": st.column_config.NumberColumn(format="%.1f"),
+            "KB fetched": st.column_config.NumberColumn(format="%.1f"),
+        },
+        hide_index=True,
+        width="stretch",
+    )
+
+    usage = cache.memory_usage()
+    st.caption(
+        f"Cache: {usage['entries']} entries, {usage['bytes'] / 2**20:.1f} MB "
+        f"of {usage['budget'] / 2**20:.0f} MB"
+    )
+
+    errors = telemetry.provider_errors()
+    if errors:
+        st.caption("Provider errors: " + ", ".join(f"{source} {count}" for source, count in errors.items()))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Prometheus", telemetry.to_prometheus(), file_name="macro_metrics.prom", width="stretch")
+    with col2:
+        st.download_button("JSON log", telemetry.to_jsonl(), file_name="macro_spans.jsonl", width="stretch")
+
+def render_earnings_section(loaded, **_):
     """
     Renders the Corporate Earnings section.
     """
-    st.subheader("💰 Corporate Earnings Watchlist")
-    
-    with st.spinner(f"Fetching earnings..."):
-        df_earnings = get_earnings_dates()
-        
-        if not df_earnings.empty:
-            st.dataframe(
-                df_earnings,
-                hide_index=False,
-                width="stretch",
-                height=400
-            )
-        else:
-            st.info("Could not fetch earnings dates. Markets might be closed or API limited.")
+    df_earnings, by_sector, by_day = loaded
+    if df_earnings.empty:
+        st.info("Could not fetch earnings dates. Markets might be closed or API limited.")
+        return
+
+    st.dataframe(
+        df_earnings,
+        column_config={
+            "Earnings Date": st.column_config.DateColumn("Date", format="MM-DD-YYYY"),
+            "Surprise(%)": st.column_config.NumberColumn(format="%.1f"),
+        },
+        hide_index=True,
+        width="stretch",
+        height=400
+    )
+
+    if by_sector.empty:
+        st.caption("No reported results in this window yet.")
+        return
+
+    stats_format = {
+        "Beat Rate (%)": st.column_config.NumberColumn(format="%.0f"),
+        "Mean Surprise (%)": st.column_config.NumberColumn(format="%.1f"),
+        "Median Surprise (%)": st.column_config.NumberColumn(format="%.1f"),
+    }
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("Surprises by sector")
+        st.dataframe(by_sector.sort_values("Reported", ascending=False), column_config=stats_format, hide_index=True, width="stretch")
+    with col2:
+        st.caption("Surprises by day")
+        st.dataframe(
+            by_day,
+            column_config={"Earnings Date": st.column_config.DateColumn("Date", format="MM-DD-YYYY"), **stats_format},
+            hide_index=True,
+            width="stretch",
+        )
 
-def render_treasury_section():
+def render_treasury_section(figures, **_):
     """
     Renders the US Treasury Yields section.
     """
-    st.subheader("🇺🇸 US Treasury Yields")
-    with st.spinner("Fetching Treasury data..."):
-        try:
-            fig_ts, fig_curve = us_treasury_plots()
-            
-            # Use columns to display charts side-by-side if space permits
-            col1, col2 = st.columns(2)
-            with col1:
-                st.plotly_chart(fig_ts, width="stretch")
-            with col2:
-                st.plotly_chart(fig_curve, width="stretch")
-        except Exception as e:
-            st.error(f"Error loading Treasury data: {e}")
+    fig_ts, fig_curve, fig_spreads = figures
+    
+    # Use columns to display charts side-by-side if space permits
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(fig_ts, width="stretch")
+    with col2:
+        st.plotly_chart(fig_curve, width="stretch")
+    st.plotly_chart(fig_spreads, width="stretch")
 
-def render_credit_section():
+def render_credit_section(loaded, **_):
     """
     Renders the Credit Spreads section.
     """
-    st.subheader("🏦 Corporate Credit Spreads (OAS)")
-    with st.spinner("Fetching Credit data..."):
-        try:
-            # 1. Fetch Data (Defaults to 1500 days lookback)
-            df_credit = get_us_credit()
-            
-            if not df_credit.empty:
-                # 2. Plot Data
-                fig = credit_spread_plots(df_credit)
-                st.plotly_chart(fig, width="stretch")
-                
-                # 3. Optional: Raw Data Expander
-                with st.expander("View Raw Credit Data"):
-                    st.dataframe(df_credit.sort_index(ascending=False).head(50), width="stretch")
-            else:
-                st.warning("No credit data available.")
-        except Exception as e:
-            st.error(f"Error loading Credit data: {e}")
+    df_credit, fig = loaded
+    if fig is None:
+        st.warning("No credit data available.")
+        return
 
-def render_fed_futures_section():
+    st.plotly_chart(fig, width="stretch")
+
+    # Optional: Raw Data Expander
+    with st.expander("View Raw Credit Data"):
+        st.dataframe(df_credit.sort_index(ascending=False).head(50), width="stretch")
+
+def render_fed_futures_section(figures, **_):
     """
     Renders the Fed Funds Futures section.
     """
-    st.subheader("🏛️ Fed Funds Futures")
-    with st.spinner("Fetching Fed Futures data..."):
-        try:
-            fig = plot_ff()
-            st.plotly_chart(fig, width="stretch")
-        except Exception as e:
-            st.error(f"Error loading Fed Futures data: {e}")
+    fig, fig_history = figures
+    if fig is not None:
+        st.plotly_chart(fig, width="stretch")
+    else:
+        st.info("No Fed Futures quotes available.")
 
-def render_calendar_section(days_ahead, show_important):
+    if fig_history is not None:
+        st.plotly_chart(fig_history, width="stretch")
+    else:
+        st.info("No Fed Futures history recorded yet.")
+
+def render_calendar_section(df_releases, show_important, **_):
     """
     Renders the Economic Calendar.
     """
-    st.divider()
-    st.subheader(f"📅 Upcoming Economic Releases (Next {days_ahead} Days)")
-
-    try:
-        fred_key = st.secrets["fredapikey"]
-        
-        # Fetch Data
-        df_releases = get_upcoming_releases(fred_key, days_ahead=days_ahead, only_important=show_important)
-
-        if not df_releases.empty:
-            st.dataframe(
-                df_releases,
-                column_config={
-                    "date": st.column_config.DateColumn("Date", format="MM-DD-YYYY"),
-                    "release_name": "Event / Indicator",
-                    "release_id": "Series ID"
-                },
-                hide_index=True,
-                width="stretch",
-                height=400 # Fixed height prevents vibration
-            )
+    if not df_releases.empty:
+        st.dataframe(
+            df_releases,
+            column_config={
+                "date": st.column_config.DateColumn("Date", format="MM-DD-YYYY"),
+                "release_name": "Event / Indicator",
+                "release_id": "Series ID"
+            },
+            hide_index=True,
+            width="stretch",
+            height=400 # Fixed height prevents vibration
+        )
+    else:
+        if show_important:
+            st.info("No 'High Impact' releases found. Try turning off the filter above.")
         else:
-            if show_important:
-                st.info("No 'High Impact' releases found. Try turning off the filter in the sidebar.")
-            else:
-                st.info("No releases found.")
+            st.info("No releases found.")
+
+def render_prices(loaded, **_):
+    """
+    Renders the Prices tab: returns heatmap of the whole group, then one page of candlesticks.
+    """
+    heatmap, grid, page, pages = loaded
+    if heatmap is None:
+        st.error("Failed to retrieve market data. Please check your connection.")
+        return
+
+    st.plotly_chart(heatmap, width="stretch")
+    st.caption(f"Page {page} of {pages}")
+    if grid is not None:
+        st.plotly_chart(grid, width="stretch")
+
+def render_correlations_section(loaded, **_):
+    """
+    Renders the cross-asset Correlations tab.
+    """
+    fig, table = loaded
+    if fig is None:
+        st.warning("Not enough price history for correlations yet.")
+        return
+
+    st.plotly_chart(fig, width="stretch")
+    st.caption("Prices: daily log returns (volatility in %). Yields and OAS: daily changes (volatility in bp).")
+    st.dataframe(
+        table,
+        column_config={
+            "Volatility (ann.)": st.column_config.NumberColumn(format="%.1f"),
+            **{c: st.column_config.NumberColumn(format="%.2f") for c in table.columns if c.startswith(("Beta", "Corr"))},
+        },
+        width="stretch",
+    )
+
+# --- 4. SECTIONS ---
+
+# Controls a section can declare as inputs. Each one renders its widget inside the
+# section's fragment, so changing it only re-runs the sections that depend on it.
+CONTROLS = {
+    "days_ahead": lambda: st.slider("Days Look Ahead", 1, data.CALENDAR_MAX_DAYS, sections.DEFAULTS["days_ahead"], key="days_ahead"),
+    "show_important": lambda: st.toggle("High Impact Only", value=sections.DEFAULTS["show_important"], key="show_important"),
+    "treasury_window": lambda: st.select_slider("History", list(plots.HISTORY_WINDOWS), value=sections.DEFAULTS["treasury_window"], key="treasury_window"),
+    "compare_date": lambda: st.date_input("Compare Curve With", value=sections.DEFAULTS["compare_date"], key="compare_date"),
+    "ff_window": lambda: st.select_slider("History", list(plots.HISTORY_WINDOWS), value=sections.DEFAULTS["ff_window"], key="ff_window"),
+    "credit_window": lambda: st.select_slider("History", list(plots.HISTORY_WINDOWS), value=sections.DEFAULTS["credit_window"], key="credit_window"),
+    "earnings_window": lambda: st.select_slider("Window (± days)", list(data.EARNINGS_WINDOWS), value=sections.DEFAULTS["earnings_window"], key="earnings_window"),
+    "prices_group": lambda: st.selectbox("Group", plots.index_groups(), key="prices_group"),
+    "prices_page": lambda: st.number_input("Page", min_value=1, value=sections.DEFAULTS["prices_page"], step=1, key="prices_page"),
+    "corr_window": lambda: st.select_slider("Window", list(plots.CORRELATION_WINDOWS), value=sections.DEFAULTS["corr_window"], key="corr_window"),
+    "corr_view": lambda: st.selectbox("Assets", plots.correlation_views(), key="corr_view"),
+    "earnings_cap": lambda: st.selectbox(
+        "Market Cap", list(data.EARNINGS_MARKET_CAPS), index=list(data.EARNINGS_MARKET_CAPS).index(sections.DEFAULTS["earnings_cap"]), key="earnings_cap"
+    ),
+}
+
+# Seconds a section waits for its data before showing its last cached value
+SECTION_TIMEOUT = 8.0
+
+@dataclass(frozen=True)
+class Section:
+    """
+    A dashboard section and the CONTROLS it depends on. `load` fetches and builds
+    everything off the script thread within `timeout` seconds; `render` draws the
+    result. Control values are passed to both as keyword arguments. `prefetch`
+    loaders are started in the background as soon as the page run begins.
+    """
+    title: str
+    load: Callable
+    render: Callable
+    inputs: tuple = ()
+    header: str = None
+    timeout: float = SECTION_TIMEOUT
+    prefetch: tuple = ()
+
+# Shown one at a time: only the selected tab is fetched and rendered
+TAB_SECTIONS = [
+    Section(
+        "Yields & Curve",
+        sections.load_treasury,
+        render_treasury_section,
+        inputs=("treasury_window", "compare_date"),
+        header="🇺🇸 US Treasury Yields",
+        prefetch=(lambda: data.get_us_yield(),),
+    ),
+    Section(
+        "Credit Spreads",
+        sections.load_credit,
+        render_credit_section,
+        inputs=("credit_window",),
+        header="🏦 Corporate Credit Spreads (OAS)",
+        prefetch=(lambda: data.get_us_credit(lookback=None),),
+    ),
+    Section(
+        "Fed Funds Futures",
+        sections.load_fed_futures,
+        render_fed_futures_section,
+        inputs=("ff_window",),
+        header="🏛️ Fed Funds Futures",
+        prefetch=(lambda: data.get_fed_futures_data(), lambda: data.get_fed_futures_history()),
+    ),
+    Section(
+        "Prices",
+        sections.load_prices,
+        render_prices,
+        inputs=("prices_group", "prices_page"),
+        header="📊 Global Market Index Prices",
+        prefetch=(lambda: data.get_index_prices(),),
+    ),
+    Section(
+        "Correlations",
+        sections.load_correlations,
+        render_correlations_section,
+        inputs=("corr_window", "corr_view"),
+        header="🔗 Cross-Asset Correlations",
+        prefetch=(lambda: data.get_index_prices(), lambda: data.get_us_yield(filled=False), lambda: data.get_us_credit(lookback=None, filled=False)),
+    ),
+]
+
+# Always shown below the tabs
+PAGE_SECTIONS = [
+    Section(
+        "Economic Calendar",
+        sections.load_calendar,
+        render_calendar_section,
+        inputs=("days_ahead", "show_important"),
+        header="📅 Upcoming Economic Releases",
+        prefetch=(lambda: data.get_release_calendar(data.get_fred_key()),),
+    ),
+    Section(
+        "Earnings",
+        sections.load_earnings,
+        render_earnings_section,
+        inputs=("earnings_window", "earnings_cap"),
+        header="💰 Corporate Earnings Watchlist",
+        prefetch=(lambda: data.get_earnings_calendar(),),
+    ),
+]
+
+# Section loads run here, so a hung provider only holds up its own section
+_section_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="section")
+
+def run_in_background(func, **kwargs):
+    return _section_pool.submit(contextvars.copy_context().run, func, **kwargs)
+
+def current_values(section):
+    """
+    Control values of a section as last set in this session (defaults before its first run).
+    """
+    return {name: st.session_state.get(name, sections.DEFAULTS[name]) for name in section.inputs}
+
+def prefetch(page_sections):
+    """
+    Starts every section's loaders at once; the sections then pick up the results
+    (or join the in-flight fetch) as they render. Sections the latest snapshot
+    covers need no loaders.
+    """
+    for section in page_sections:
+        if snapshot.lookup(section.title, current_values(section)) is not None:
+            continue
+        for loader in section.prefetch:
+            run_in_background(loader)
 
-    except KeyError:
-        st.error("⚠️ FRED API Key not found in secrets.")
+def load_with_deadline(section, values):
+    """
+    Returns (payload, as_of, problem). If the load fails or misses the section's
+    deadline, it is answered from cached values only: `as_of` is then when the
+    oldest value used was fetched and `problem` what went wrong. Raises the original
+    problem when nothing is cached.
+    """
+    future = run_in_background(section.load, **values)
+    try:
+        return future.result(timeout=section.timeout), None, None
+    except FuturesTimeout:
+        problem = FuturesTimeout(f"{section.title} did not load within {section.timeout:g}s")
     except Exception as e:
-        st.error(f"Calendar Error: {e}")
+        problem = e
+
+    # A timed-out load keeps running and refreshes the cache for the next run
+    try:
+        with cache.stale_only() as served:
+            payload = section.load(**values)
+    except cache.NotCached:
+        raise problem from None
+    return payload, min(served, default=None), problem
 
-def render_prices():
+def render_stale_badge(section, as_of, problem):
     """
-    Renders the Index Prices tab. Logic is fully encapsulated in plots.py.
+    Marks a section drawn from cached data, with a button to try again.
     """
-    st.divider()
-    st.subheader("📊 Global Market Index Prices")
+    reason = str(problem) if isinstance(problem, FuturesTimeout) else f"{section.title} failed to load: {problem}"
+
+    age = "" if as_of is None else f" · {_format_age(time.time() - as_of)} old"
+    col1, col2 = st.columns([6, 1])
+    with col1:
+        st.badge(f"Stale{age}", icon=":material/history:", color="orange", help=reason)
+    with col2:
+        if st.button("Retry", key=f"retry_{section.title}", width="stretch"):
+            st.rerun(scope="fragment")
+
+def _format_age(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:.0f} h"
+    return f"{seconds / 86400:.0f} days"
 
-    with st.spinner("Fetching latest market prices..."):
+@st.fragment
+def render_section(section):
+    """
+    Renders one section as a fragment, so its own widgets only re-run this section.
+    """
+    if section.header:
+        st.subheader(section.header)
+
+    values = {}
+    if section.inputs:
+        for column, name in zip(st.columns(len(section.inputs)), section.inputs):
+            with column:
+                values[name] = CONTROLS[name]()
+
+    # Pre-built by snapshot.py for these control values: no loading at all
+    built = snapshot.lookup(section.title, values)
+    if built is not None:
+        section.render(built[0], **values)
+        return
+
+    with st.spinner(f"Fetching {section.title}..."):
         try:
-            # Simply call the function; it handles the list and the download
-            fig = plot_indexes()
-            
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.error("Failed to retrieve market data. Please check your connection.")
-                
+            payload, as_of, problem = load_with_deadline(section, values)
+        except FuturesTimeout as e:
+            telemetry.record_error("deadline", e)
+            st.warning(f"{section.title} is taking longer than usual. Retry in a moment.")
+            return
         except Exception as e:
-            st.error(f"Error loading Index Prices: {e}")
+            st.error(f"Error loading {section.title}: {e}")
+            return
 
-# --- 4. MAIN APP LOGIC ---
+    if problem is not None:
+        if isinstance(problem, FuturesTimeout):
+            telemetry.record_error("deadline", problem)
+        render_stale_badge(section, as_of, problem)
+
+    section.render(payload, **values)
+
+# --- 5. MAIN APP LOGIC ---
 
 def main():
     if check_password():
-        # A. Render Sidebar & Get Settings
-        days_ahead, show_important = render_sidebar()
+        # A. Render Sidebar
+        render_sidebar()
 
         # B. Header
         st.title("FBU Macro Dashboard")
 
-        # C. Market Data Tabs (Clean layout)
-        tab_rates, tab_credit, tab_fed_futures, tab_prices = st.tabs(["Yields & Curve", "Credit Spreads", "Fed Funds Futures", "Prices"])
-
-        with tab_rates:
-            render_treasury_section()
-        
-        with tab_credit:
-            render_credit_section()
-
-        with tab_fed_futures:
-            render_fed_futures_section()
+        # C. Market Data Tabs (st.tabs would run every tab body, so only the selected one is rendered)
+        titles = [section.title for section in TAB_SECTIONS]
+        active = st.segmented_control(
+            "Section", titles, default=titles[0], key="active_tab", label_visibility="collapsed"
+        )
+        active_section = next((s for s in TAB_SECTIONS if s.title == active), TAB_SECTIONS[0])
 
-        with tab_prices:    
-            render_prices()
-        # D. Economic Calendar
-        render_calendar_section(days_ahead, show_important)
+        # Every visible section starts fetching now; each renders as soon as its data is in
+        prefetch([active_section, *PAGE_SECTIONS])
+        render_section(active_section)
 
-        # E. Earnings Section (Optional)
-        render_earnings_section()
+        # D. Economic Calendar & Earnings
+        for section in PAGE_SECTIONS:
+            st.divider()
+            render_section(section)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Benchmark harness for the dashboard's loaders and figure builders.
+
+Runs every data.py loader and plots.py builder against the local stand-in (see
+standin.py), serving recorded fixtures or, without --fixtures, generated data,
+and reports, per section:
+
+  cold   - empty on-disk store and empty in-memory caches (first page load)
+  warm   - in-memory cache hit (a rerun within the TTL)
+  rerun  - in-memory caches dropped, on-disk store kept (restart / TTL expiry)
+  peak   - peak Python heap allocated during a cold run (tracemalloc)
+
+    python bench.py --latency 0.2
+    python bench.py --fixtures fixtures --latency 0.2
+    python bench.py --fixtures fixtures --compare bench_results/<old>.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Must be set before the project modules read them at import time
+STORE_DIR = tempfile.mkdtemp(prefix="macro-bench-store-")
+os.environ["MACRO_STORE_DIR"] = STORE_DIR
+os.environ["MACRO_PROVIDER_MODE"] = "replay"
+os.environ.setdefault("FRED_API_KEY", "bench")
+
+import analytics  # noqa: E402
+import cache  # noqa: E402
+import curves  # noqa: E402
+import data  # noqa: E402
+import figcache  # noqa: E402
+import futures  # noqa: E402
+import plots  # noqa: E402
+import providers  # noqa: E402
+import rolling  # noqa: E402
+from standin import start_standin  # noqa: E402
+
+SECTIONS = {
+    "get_us_yield": lambda: data.get_us_yield(360),
+    "get_us_credit": lambda: data.get_us_credit(),
+    "get_fed_futures_data": lambda: data.get_fed_futures_data(),
+    "get_upcoming_releases": lambda: data.get_upcoming_releases(data.get_fred_key(), days_ahead=60, only_important=False),
+    "get_earnings_dates": lambda: data.get_earnings_dates(),
+    "get_index_prices": lambda: data.get_index_prices(),
+    "us_treasury_plots": lambda: plots.us_treasury_plots(),
+    "credit_spread_plots": lambda: plots.credit_spread_plots(data.get_us_credit()),
+    "plot_ff": lambda: plots.plot_ff(),
+    "plot_indexes": lambda: plots.plot_indexes(),
+    "plot_correlations": lambda: plots.plot_correlations(),
+}
+
+
+def clear_memory():
+    cache.clear_all()
+    figcache.clear_figures()
+    futures.clear_chain_cache()
+    # Incremental engines: a restart starts them from scratch too
+    rolling.clear_engines()
+    curves.clear_engines()
+    analytics.clear_engines()
+
+
+def clear_all():
+    clear_memory()
+    shutil.rmtree(STORE_DIR, ignore_errors=True)
+
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_section(func, repeat):
+    cold, warm, rerun = [], [], []
+    for _ in range(repeat):
+        clear_all()
+        cold.append(_timed(func))
+        warm.append(_timed(func))
+        clear_memory()
+        rerun.append(_timed(func))
+
+    clear_all()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "cold_s": statistics.median(cold),
+        "warm_s": statistics.median(warm),
+        "rerun_s": statistics.median(rerun),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def print_table(results, baseline=None):
+    header = f"{'section':<24}{'cold s':>10}{'warm s':>10}{'rerun s':>10}{'peak MB':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:<24}  error: {r['error']}")
+            continue
+        line = f"{name:<24}{r['cold_s']:>10.4f}{r['warm_s']:>10.4f}{r['rerun_s']:>10.4f}{r['peak_mb']:>10.1f}"
+        old = (baseline or {}).get(name)
+        if old and "cold_s" in old and old["cold_s"] > 0:
+            line += f"   cold {100 * (r['cold_s'] / old['cold_s'] - 1):+.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold / warm / rerun benchmarks for the dashboard sections.")
+    parser.add_argument("--fixtures", help="directory of recorded responses (default: generated data)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated provider latency (seconds)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sections", nargs="*", default=list(SECTIONS), help="subset of sections to run")
+    parser.add_argument("--output", help="results file (default bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    server, url = start_standin(args.fixtures, latency=args.latency)
+    providers.STANDIN_URL = url
+
+    results = {}
+    try:
+        for name in args.sections:
+            try:
+                results[name] = bench_section(SECTIONS[name], args.repeat)
+            except Exception as e:
+                results[name] = {"error": str(e)}
+    finally:
+        server.shutdown()
+        shutil.rmtree(STORE_DIR, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "latency_s": args.latency,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    output = Path(args.output or f"bench_results/{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    baseline = json.loads(Path(args.compare).read_text())["results"] if args.compare else None
+    print_table(results, baseline)
+    print(f"\nSaved {output}")
+    return 0 if all("error" not in r for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""
+Stale-while-revalidate cache for the data.py loaders.
+
+Once an entry is older than its soft TTL the last good value is still returned
+straight away and a single background refresh is started for that key. Callers
+only wait on the network when there is no value yet or it is older than the
+hard `max_stale` limit, and even then only one of them fetches while the others
+wait for its result.
+
+Entries live in a pluggable backend (see cache_backends). With a shared backend
+(SQLite / Redis) the single-flight also holds across processes: the replica that
+wins the refresh lease fetches, the others serve the shared copy.
+
+Loaders can be grouped into namespaces (one per data source) so a single source
+can be refreshed or evicted without touching the others.
+
+Inside `with stale_only():` loaders never fetch: they answer from whatever is
+cached, however old (used when a page section misses its deadline).
+
+Cached frames are stored compactly (see compact.py) and the in-process copies are
+kept within MAX_BYTES, evicting the least recently used entries first.
+"""
+import contextvars
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from cache_backends import CacheEntry, SizedLRU, backend_from_url
+from lazy import lazy_import
+from telemetry import record_cache, record_error, span
+
+# Needs pandas, which the login page doesn't load
+compact = lazy_import("compact")
+
+# A refresh lease held longer than this is assumed dead and can be taken over
+LEASE_SECONDS = 120
+
+# How often a process without a usable value polls while another one refreshes
+POLL_SECONDS = 0.25
+
+# Per-process memory budget for cached values (MACRO_CACHE_MAX_MB)
+MAX_BYTES = int(float(os.environ.get("MACRO_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+_backend = backend_from_url(os.environ.get("MACRO_CACHE_BACKEND", "memory"), max_bytes=MAX_BYTES)
+_local = SizedLRU(MAX_BYTES)  # key -> CacheEntry, mirror of the backend (avoids re-reading unchanged values)
+_inflight = {}  # key -> threading.Event set when this process's refresh finishes
+_namespaces = {}  # namespace -> cached loaders and invalidation hooks
+_lock = threading.Lock()
+
+# List collecting the fetched_at of every value served inside stale_only(), else None
+_stale_only = contextvars.ContextVar("stale_only", default=None)
+
+
+class NotCached(LookupError):
+    """
+    Raised inside stale_only() by a loader that has nothing cached.
+    """
+
+
+@contextmanager
+def stale_only():
+    """
+    Within this block cached loaders return their last value without fetching (or
+    raise NotCached). Yields a list of the fetched_at times of the values served.
+    """
+    served = []
+    token = _stale_only.set(served)
+    try:
+        yield served
+    finally:
+        _stale_only.reset(token)
+
+
+def configure(backend):
+    """
+    Switches the cache backend (e.g. SQLiteBackend(path) or RedisBackend(client=...)).
+    """
+    global _backend
+    with _lock:
+        _backend = backend
+        _local.clear()
+
+
+def _is_empty(value):
+    return value is None or getattr(value, "empty", False) is True
+
+
+def _load(key):
+    """
+    Current entry for `key`; the value is only read from the backend when it is newer
+    than the local mirror.
+    """
+    stamp = _backend.stamp(key)
+    if stamp is None:
+        with _lock:
+            _local.pop(key, None)
+        return None
+
+    fetched_at, checked_at = stamp
+    with _lock:
+        entry = _local.touch(key)
+    if entry is None or entry.fetched_at < fetched_at:
+        entry = _backend.get(key)
+        if entry is None:
+            return None
+        if not entry.nbytes:
+            entry.nbytes = compact.value_nbytes(entry.value)
+        with _lock:
+            _local[key] = entry
+
+    # The backend's timestamp wins, so an expire from another process is seen here
+    entry.checked_at = checked_at
+    return entry
+
+
+def _store(key, entry):
+    _backend.set(key, entry)
+    with _lock:
+        _local[key] = entry
+
+
+def _refresh(func, key, args, kwargs, max_stale, compact_values=True):
+    """
+    Calls the loader and stores (and returns) the compacted result. The caller must
+    own the in-flight slot and the backend lease; both are released here.
+    """
+    try:
+        value = func(*args, **kwargs)
+        if compact_values:
+            value = compact.compact_value(value)
+        now = time.time()
+        current = _load(key)
+        # Loaders return an empty frame on provider errors: keep serving the last good value
+        if (_is_empty(value) and current is not None and not _is_empty(current.value)
+                and now - current.fetched_at < max_stale):
+            current.checked_at = now
+            _backend.touch(key, now)
+        else:
+            _store(key, CacheEntry(value, now, nbytes=compact.value_nbytes(value)))
+        return value
+    except Exception:
+        _backend.touch(key, time.time())
+        raise
+    finally:
+        _backend.release(key)
+        with _lock:
+            _inflight.pop(key).set()
+
+
+def _background_refresh(func, key, args, kwargs, max_stale, compact_values):
+    try:
+        with span(func.__qualname__, "refresh"):
+            _refresh(func, key, args, kwargs, max_stale, compact_values)
+    except Exception as e:
+        record_error(func.__qualname__, e)
+
+
+def _key_prefix(func):
+    return f"{func.__module__}.{func.__qualname__}:"
+
+
+def swr_cache(ttl=3600, max_stale=6 * 3600, namespace=None, compact_values=True):
+    """
+    Drop-in replacement for @st.cache_data(ttl=...) with stale-while-revalidate
+    semantics. Values are shared between callers, so don't mutate them in place.
+
+    ttl: seconds after which a background refresh is started.
+    max_stale: seconds after which a cached value is no longer served.
+    namespace: data source the loader belongs to (see refresh / evict).
+    compact_values: store frames with compact dtypes (float32, categoricals).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        prefix = _key_prefix(func)
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            # Hashed so arguments such as API keys never end up in a shared store
+            digest = hashlib.sha1(repr(tuple(bound.arguments.items())).encode()).hexdigest()
+            return prefix + digest
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+
+            served = _stale_only.get()
+            if served is not None:
+                entry = _load(key)
+                if entry is None:
+                    raise NotCached(func.__qualname__)
+                record_cache("stale")
+                served.append(entry.fetched_at)
+                return entry.value
+
+            while True:
+                now = time.time()
+                entry = _load(key)
+                usable = entry is not None and now - entry.fetched_at < max_stale
+                needs_refresh = not usable or now - entry.checked_at >= ttl
+
+                with _lock:
+                    event = _inflight.get(key)
+                    leader = needs_refresh and event is None
+                    if leader:
+                        event = _inflight[key] = threading.Event()
+
+                if leader and not _backend.acquire(key, LEASE_SECONDS):
+                    # Another process holds the refresh lease
+                    with _lock:
+                        _inflight.pop(key).set()
+                    leader = False
+                    if not usable:
+                        time.sleep(POLL_SECONDS)
+                        continue
+
+                if usable:
+                    record_cache("stale" if needs_refresh else "hit")
+                    if leader:
+                        threading.Thread(
+                            target=_background_refresh,
+                            args=(func, key, args, kwargs, max_stale, compact_values),
+                            daemon=True,
+                        ).start()
+                    return entry.value
+
+                if leader:
+                    record_cache("miss")
+                    return _refresh(func, key, args, kwargs, max_stale, compact_values)
+
+                # Another caller in this process is already fetching this key
+                event.wait()
+
+        def refresh():
+            _backend.expire_prefix(prefix)
+
+        def clear():
+            _backend.delete_prefix(prefix)
+            with _lock:
+                for key in [k for k in _local if k.startswith(prefix)]:
+                    del _local[key]
+
+        wrapper.refresh = refresh
+        wrapper.clear = clear
+        if namespace is not None:
+            _namespace(namespace).append((refresh, clear))
+        return wrapper
+
+    return decorator
+
+
+def _namespace(name):
+    with _lock:
+        return _namespaces.setdefault(name, [])
+
+
+def add_invalidation_hook(namespace, hook):
+    """
+    Registers a callable run whenever `namespace` is refreshed or evicted, for
+    caches outside this module (e.g. the futures quote cache).
+    """
+    _namespace(namespace).append((hook, hook))
+
+
+def namespaces():
+    """
+    Names of the registered data sources.
+    """
+    with _lock:
+        return sorted(_namespaces)
+
+
+def refresh(namespace):
+    """
+    Marks every cached value of `namespace` as due: callers keep getting the current
+    value while one background refresh per key fetches a new one.
+    """
+    for on_refresh, _ in list(_namespaces[namespace]):
+        on_refresh()
+
+
+def evict(namespace):
+    """
+    Drops every cached value of `namespace`; the next caller fetches it again.
+    """
+    for _, on_evict in list(_namespaces[namespace]):
+        on_evict()
+
+
+def memory_usage():
+    """
+    Bytes held by this process's cached values, in total and per loader.
+    """
+    with _lock:
+        entries = list(_local.items())
+    by_loader = {}
+    for key, entry in entries:
+        loader = key.rsplit(":", 1)[0]
+        by_loader[loader] = by_loader.get(loader, 0) + entry.nbytes
+    return {
+        "entries": len(entries),
+        "bytes": sum(by_loader.values()),
+        "budget": MAX_BYTES,
+        "by_loader": by_loader,
+    }
+
+
+def clear_all():
+    """
+    Drops every cached entry (in-flight refreshes still complete and store their result).
+    """
+    _backend.clear()
+    with _lock:
+        _local.clear()
@@ -0,0 +1,314 @@
+"""
+Storage backends for the stale-while-revalidate cache (cache.py).
+
+  memory   - per-process dict (default)
+  sqlite   - one SQLite file shared by every process on the host / volume
+  redis    - a Redis server shared by every replica (any client with the redis-py
+             API works, e.g. fakeredis.FakeRedis() as a local stand-in in tests)
+
+Shared backends also provide a cross-process refresh lease, so only one replica
+fetches a given dataset while the others keep serving the shared copy.
+
+Select with MACRO_CACHE_BACKEND ("memory", "sqlite:///path/cache.db",
+"redis://host:6379/0") or cache.configure(backend).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class CacheEntry:
+    __slots__ = ("value", "fetched_at", "checked_at", "nbytes")
+
+    def __init__(self, value, fetched_at, checked_at=None, nbytes=0):
+        self.value = value
+        self.fetched_at = fetched_at  # when `value` was fetched
+        self.checked_at = fetched_at if checked_at is None else checked_at  # last refresh attempt
+        self.nbytes = nbytes  # approximate in-memory size of `value`
+
+
+class SizedLRU(OrderedDict):
+    """
+    key -> CacheEntry in least-recently-used order, evicting the oldest entries once
+    their total nbytes exceeds `max_bytes` (None = unbounded). Not thread-safe.
+    """
+
+    def __init__(self, max_bytes=None):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+    def touch(self, key):
+        entry = OrderedDict.get(self, key)
+        if entry is not None:
+            self.move_to_end(key)
+        return entry
+
+    def __setitem__(self, key, entry):
+        if key in self:
+            self.nbytes -= OrderedDict.__getitem__(self, key).nbytes
+        super().__setitem__(key, entry)
+        self.move_to_end(key)
+        self.nbytes += entry.nbytes
+
+        # The newest entry is kept even when it alone exceeds the budget
+        while self.max_bytes is not None and self.nbytes > self.max_bytes and len(self) > 1:
+            self.popitem(last=False)
+
+    def __delitem__(self, key):
+        self.nbytes -= OrderedDict.__getitem__(self, key).nbytes
+        super().__delitem__(key)
+
+    def popitem(self, last=True):
+        key, entry = super().popitem(last=last)
+        self.nbytes -= entry.nbytes
+        return key, entry
+
+    def pop(self, key, *default):
+        if key in self:
+            entry = OrderedDict.__getitem__(self, key)
+            del self[key]
+            return entry
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def clear(self):
+        super().clear()
+        self.nbytes = 0
+
+
+class MemoryBackend:
+    """
+    Per-process storage, optionally bounded to `max_bytes` (size-aware LRU).
+    Refresh leases are always granted: the in-process single-flight in cache.py
+    already covers concurrent sessions.
+    """
+
+    def __init__(self, max_bytes=None):
+        self._entries = SizedLRU(max_bytes)
+        self._lock = threading.Lock()
+
+    def stamp(self, key):
+        with self._lock:
+            entry = self._entries.touch(key)
+            return None if entry is None else (entry.fetched_at, entry.checked_at)
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.touch(key)
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def touch(self, key, checked_at):
+        with self._lock:
+            if key in self._entries:
+                self._entries[key].checked_at = checked_at
+
+    def expire_prefix(self, prefix):
+        with self._lock:
+            for key, entry in self._entries.items():
+                if key.startswith(prefix):
+                    entry.checked_at = 0
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def acquire(self, key, lease):
+        return True
+
+    def release(self, key):
+        pass
+
+
+class SQLiteBackend:
+    """
+    SQLite file shared between processes (WAL mode, one connection per thread).
+    Leases are rows in a `leases` table claimed inside an IMMEDIATE transaction.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value BLOB, fetched_at REAL, checked_at REAL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires REAL)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def stamp(self, key):
+        row = self._conn().execute(
+            "SELECT fetched_at, checked_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value, fetched_at, checked_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(pickle.loads(row[0]), row[1], row[2])
+
+    def set(self, key, entry):
+        blob = pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (key, value, fetched_at, checked_at) VALUES (?, ?, ?, ?)",
+            (key, blob, entry.fetched_at, entry.checked_at),
+        )
+
+    def touch(self, key, checked_at):
+        self._conn().execute("UPDATE entries SET checked_at = ? WHERE key = ?", (checked_at, key))
+
+    def expire_prefix(self, prefix):
+        self._conn().execute("UPDATE entries SET checked_at = 0 WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def delete_prefix(self, prefix):
+        self._conn().execute("DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM entries")
+
+    def acquire(self, key, lease):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                (key, self.owner, now + lease),
+            ).rowcount == 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimed
+
+    def release(self, key):
+        self._conn().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+
+class RedisBackend:
+    """
+    Redis-backed storage shared by all replicas. Each entry is a hash with the
+    pickled value and its timestamps; leases use SET NX PX.
+    """
+
+    def __init__(self, url=None, client=None, namespace="macro"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("RedisBackend needs the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._watch_error = _watch_error()
+        self.namespace = namespace
+        self.owner = uuid.uuid4().hex
+
+    def _key(self, key):
+        return f"{self.namespace}:entry:{key}"
+
+    def _lease(self, key):
+        return f"{self.namespace}:lease:{key}"
+
+    def stamp(self, key):
+        fetched_at, checked_at = self.client.hmget(self._key(key), "fetched_at", "checked_at")
+        if fetched_at is None:
+            return None
+        return float(fetched_at), float(checked_at)
+
+    def get(self, key):
+        value, fetched_at, checked_at = self.client.hmget(self._key(key), "value", "fetched_at", "checked_at")
+        if value is None:
+            return None
+        return CacheEntry(pickle.loads(value), float(fetched_at), float(checked_at))
+
+    def set(self, key, entry):
+        self.client.hset(self._key(key), mapping={
+            "value": pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL),
+            "fetched_at": entry.fetched_at,
+            "checked_at": entry.checked_at,
+        })
+
+    def touch(self, key, checked_at):
+        if self.client.exists(self._key(key)):
+            self.client.hset(self._key(key), "checked_at", checked_at)
+
+    def expire_prefix(self, prefix):
+        for key in self.client.scan_iter(match=self._key(prefix) + "*"):
+            self.client.hset(key, "checked_at", 0)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self._key(prefix) + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        self.delete_prefix("")
+
+    def acquire(self, key, lease):
+        return bool(self.client.set(self._lease(key), self.owner, nx=True, px=int(lease * 1000)))
+
+    def release(self, key):
+        # Compare-and-delete in a WATCH transaction, so an expired lease that another
+        # replica has since taken over is left alone
+        lease_key = self._lease(key)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(lease_key)
+                if pipe.get(lease_key) == self.owner.encode():
+                    pipe.multi()
+                    pipe.delete(lease_key)
+                    pipe.execute()
+            except self._watch_error:
+                pass
+
+
+def _watch_error():
+    try:
+        from redis.exceptions import WatchError
+    except ImportError:
+        return ()
+    return WatchError
+
+
+def backend_from_url(url, max_bytes=None):
+    """
+    Builds a backend from a MACRO_CACHE_BACKEND value (`max_bytes` bounds the memory backend).
+    """
+    if not url or url == "memory":
+        return MemoryBackend(max_bytes)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unknown cache backend: {url}")
@@ -0,0 +1,94 @@
+"""
+Import-time budget check for the dashboard's cold start.
+
+Each module is imported in a fresh interpreter (after streamlit, which every
+page load pays for anyway). The check fails when an import takes longer than
+its budget or pulls in a library that should only load once a section needs it:
+
+    $ python check_imports.py
+    $ python check_imports.py --repeat 5 --json import_times.json
+
+Exits with status 1 on a regression, so it can gate CI.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# module -> (seconds on top of streamlit, libraries it must not load)
+BUDGETS = {
+    # Everything up to the password prompt
+    "app": (0.25, ["pandas", "numpy", "plotly", "yfinance", "matplotlib", "pyarrow", "requests"]),
+    # Data layer: FRED sections must not pay for Yahoo or the charts
+    "data": (1.5, ["plotly", "yfinance", "matplotlib"]),
+    "plots": (2.0, ["yfinance", "matplotlib"]),
+}
+
+_PROBE = """
+import json, sys, time
+import streamlit
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": sorted(set(sys.modules) - before)}}))
+"""
+
+
+def measure(module):
+    """
+    Seconds to import `module` in a fresh interpreter, and the top-level packages it loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    packages = sorted({name.split(".")[0] for name in probe["loaded"]})
+    return probe["seconds"], packages
+
+
+def check(repeat=3):
+    """
+    Returns one result row per BUDGETS module (best of `repeat` runs).
+    """
+    rows = []
+    for module, (budget, forbidden) in BUDGETS.items():
+        runs = [measure(module) for _ in range(repeat)]
+        seconds = min(s for s, _ in runs)
+        packages = runs[0][1]
+        leaked = [name for name in forbidden if name in packages]
+        rows.append({
+            "module": module,
+            "seconds": round(seconds, 4),
+            "budget": budget,
+            "leaked": leaked,
+            "ok": seconds <= budget and not leaked,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module (the fastest counts)")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = check(args.repeat)
+    for row in rows:
+        status = "ok" if row["ok"] else "FAIL"
+        leaked = f"  loads {', '.join(row['leaked'])}" if row["leaked"] else ""
+        print(f"{status:4}  {row['module']:8} {row['seconds'] * 1000:8.1f} ms  (budget {row['budget'] * 1000:.0f} ms){leaked}")
+
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+
+    sys.exit(0 if all(row["ok"] for row in rows) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compact in-memory representations for cached loader results (see cache.py).
+
+  - float64 columns become float32 when every value round-trips within FLOAT_RTOL
+    (FRED and Yahoo data carry at most a few significant decimals)
+  - integer columns are downcast to the smallest type holding their range
+  - string columns with many repeats (release names, event types, sectors)
+    become categoricals, so each distinct string is stored once
+
+Cached frames are shared between callers rather than copied for each of them;
+pandas' copy-on-write (always on from pandas 3, see requirements.txt) keeps a
+caller's changes from reaching the shared buffers.
+"""
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# Largest relative error accepted when storing a float column as float32
+FLOAT_RTOL = 1e-6
+
+# String columns become categorical when distinct values / rows is at most this
+CATEGORY_MAX_RATIO = 0.5
+
+def _target_dtype(column):
+    """
+    Smaller dtype for a Series, or None to keep it as is.
+    """
+    dtype = column.dtype
+    if dtype == "float64":
+        values = column.to_numpy()
+        narrowed = values.astype("float32")
+        with np.errstate(over="ignore", invalid="ignore"):
+            if np.allclose(narrowed, values, rtol=FLOAT_RTOL, atol=0, equal_nan=True):
+                return "float32"
+        return None
+
+    if pd.api.types.is_integer_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype) and len(column):
+        low, high = column.min(), column.max()
+        for candidate in ("int8", "int16", "int32"):
+            info = np.iinfo(candidate)
+            if info.min <= low and high <= info.max:
+                return candidate if np.dtype(candidate).itemsize < np.dtype(dtype).itemsize else None
+        return None
+
+    if (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)) and len(column) > 1:
+        if pd.api.types.infer_dtype(column, skipna=True) != "string":
+            return None
+        if column.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(column):
+            return "category"
+    return None
+
+
+def compact_frame(df):
+    """
+    Returns `df` with compact column dtypes (unchanged columns share their buffers).
+    """
+    dtypes = {}
+    for position, label in enumerate(df.columns):
+        target = _target_dtype(df.iloc[:, position])
+        if target is not None:
+            dtypes[label] = target
+    return df.astype(dtypes) if dtypes else df
+
+
+def compact_value(value):
+    """
+    Compacts DataFrames and Series (also inside tuples); other values are returned as is.
+    """
+    if isinstance(value, pd.DataFrame):
+        return compact_frame(value)
+    if isinstance(value, pd.Series):
+        target = _target_dtype(value)
+        return value.astype(target) if target is not None else value
+    if isinstance(value, tuple):
+        return tuple(compact_value(v) for v in value)
+    return value
+
+
+def value_nbytes(value):
+    """
+    Approximate memory held by a cached value, in bytes.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if isinstance(value, tuple):
+        return sum(value_nbytes(v) for v in value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
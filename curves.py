@@ -0,0 +1,241 @@
+"""
+Yield-curve analytics over the full get_us_yield() history.
+
+YieldCurves turns the tenor frame into one (dates x tenors) NumPy array and computes,
+for every date at once:
+
+  - standard spreads (2s10s, 3m10y, 5s30s) and butterflies, in bps
+  - Nelson-Siegel level / slope / curvature factors (fixed decay, batched least squares)
+  - linearly interpolated yields at arbitrary maturities
+
+Any date is then answered with a binary search instead of another fetch and melt.
+Lookbacks are calendar offsets (1 week / 1 month / 1 year before the latest date,
+resolved to the last observation on or before that day), not row counts.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from figcache import frame_fingerprint
+
+# Maturity in years of each get_us_yield() column
+TENOR_YEARS = {
+    "US1M": 1 / 12,
+    "US3M": 0.25,
+    "US1Y": 1.0,
+    "US2Y": 2.0,
+    "US5Y": 5.0,
+    "US10Y": 10.0,
+    "US20Y": 20.0,
+    "US30Y": 30.0,
+}
+
+# name -> (short leg, long leg); long minus short
+SPREADS = {
+    "2s10s": ("US2Y", "US10Y"),
+    "3m10y": ("US3M", "US10Y"),
+    "5s30s": ("US5Y", "US30Y"),
+}
+
+# name -> (short wing, body, long wing); 2 x body minus both wings
+BUTTERFLIES = {
+    "2s5s10s": ("US2Y", "US5Y", "US10Y"),
+    "5s10s30s": ("US5Y", "US10Y", "US30Y"),
+}
+
+LOOKBACKS = {
+    "1 Week Ago": pd.DateOffset(weeks=1),
+    "1 Month Ago": pd.DateOffset(months=1),
+    "1 Year Ago": pd.DateOffset(years=1),
+}
+
+# Nelson-Siegel decay in 1/years (Diebold-Li's 0.0609 per month): the curvature
+# loading peaks at roughly 2.5 years
+NS_DECAY = 0.7308
+
+# Fewer observed tenors than this on a date leave its Nelson-Siegel fit undefined
+NS_MIN_TENORS = 4
+
+MAX_ENGINES = 4
+
+
+def ns_loadings(maturities, decay=NS_DECAY):
+    """
+    Nelson-Siegel factor loadings (level, slope, curvature) as a (len(maturities), 3) array.
+    """
+    x = np.asarray(maturities, dtype="float64") * decay
+    slope = (1 - np.exp(-x)) / x
+    return np.column_stack([np.ones_like(x), slope, slope - np.exp(-x)])
+
+
+def fit_nelson_siegel(yields, maturities, decay=NS_DECAY, min_tenors=NS_MIN_TENORS):
+    """
+    Least-squares Nelson-Siegel betas for every row of `yields` (NaN = tenor not observed).
+    Returns an (n_rows, 3) array; rows with fewer than `min_tenors` observations are NaN.
+    """
+    yields = np.asarray(yields, dtype="float64")
+    loadings = ns_loadings(maturities, decay)
+    observed = ~np.isnan(yields)
+    weights = observed.astype("float64")
+
+    # Per-row normal equations, masked to the observed tenors
+    xtx = np.einsum("nk,ki,kj->nij", weights, loadings, loadings)
+    xty = np.einsum("nk,ki->ni", np.where(observed, yields, 0.0), loadings)
+
+    betas = np.full((len(yields), 3), np.nan)
+    fit = observed.sum(axis=1) >= min_tenors
+    if fit.any():
+        betas[fit] = np.linalg.solve(xtx[fit], xty[fit][..., None])[..., 0]
+    return betas
+
+
+def interpolate(yields, maturities, targets):
+    """
+    Linearly interpolated yields at `targets` (years) for every row, using the
+    nearest observed tenor on each side. No extrapolation: targets outside a
+    row's observed range are NaN.
+    """
+    yields = np.asarray(yields, dtype="float64")
+    maturities = np.asarray(maturities, dtype="float64")
+    targets = np.atleast_1d(np.asarray(targets, dtype="float64"))
+    observed = ~np.isnan(yields)
+    positions = np.arange(len(maturities))
+    rows = np.arange(len(yields))[:, None]
+
+    # (rows, tenors, targets): nearest observed tenor at or below / at or above each target
+    observed = observed[:, :, None]
+    positions = positions[None, :, None]
+    below = maturities[None, :, None] <= targets[None, None, :]
+    above = maturities[None, :, None] >= targets[None, None, :]
+    lower = np.where(observed & below, positions, -1).max(axis=1)
+    upper = np.where(observed & above, positions, len(maturities)).min(axis=1)
+
+    valid = (lower >= 0) & (upper < len(maturities))
+    lo, hi = np.clip(lower, 0, None), np.clip(upper, None, len(maturities) - 1)
+    y_lo, y_hi = yields[rows, lo], yields[rows, hi]
+    m_lo, m_hi = maturities[lo], maturities[hi]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(hi == lo, 0.0, (targets - m_lo) / (m_hi - m_lo))
+    return np.where(valid, y_lo + weight * (y_hi - y_lo), np.nan)
+
+
+class YieldCurves:
+    """
+    Curve analytics over a get_us_yield() frame (see module docstring).
+    """
+
+    def __init__(self, df):
+        columns = [c for c in TENOR_YEARS if c in df.columns]
+        df = df[columns].sort_index()
+
+        self.tenors = columns
+        self.maturities = np.array([TENOR_YEARS[c] for c in columns])
+        self.index = pd.DatetimeIndex(df.index)
+        self.dates = self.index.values
+        self.yields = df.to_numpy(dtype="float64")
+
+        # Everything below is computed once for all dates
+        self.spreads = self._combine(SPREADS, lambda short, long: long - short)
+        self.butterflies = self._combine(BUTTERFLIES, lambda short, body, long: 2 * body - short - long)
+        self.factors = pd.DataFrame(
+            fit_nelson_siegel(self.yields, self.maturities),
+            index=self.index,
+            columns=["level", "slope", "curvature"],
+        )
+
+    def _column(self, tenor):
+        return self.yields[:, self.tenors.index(tenor)]
+
+    def _combine(self, definitions, combine):
+        # Definitions needing a tenor that isn't loaded are skipped; values in bps
+        available = {
+            name: legs for name, legs in definitions.items()
+            if all(leg in self.tenors for leg in legs)
+        }
+        return pd.DataFrame(
+            {name: 100 * combine(*(self._column(leg) for leg in legs)) for name, legs in available.items()},
+            index=self.index,
+        )
+
+    def position(self, when):
+        """
+        Row of the last observation on or before `when` (None if `when` precedes the history).
+        """
+        i = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(when), "ns"), side="right")) - 1
+        return i if i >= 0 else None
+
+    def curve(self, when):
+        """
+        Observed curve (Series by tenor) on the last date on or before `when`, or None.
+        """
+        i = self.position(when)
+        if i is None:
+            return None
+        return pd.Series(self.yields[i], index=self.tenors, name=self.index[i])
+
+    def fitted_curve(self, when, maturities):
+        """
+        Nelson-Siegel curve on the last date on or before `when`, evaluated at `maturities`.
+        """
+        i = self.position(when)
+        if i is None:
+            return None
+        return pd.Series(ns_loadings(maturities) @ self.factors.iloc[i].to_numpy(), index=maturities, name=self.index[i])
+
+    def interpolated(self, maturities):
+        """
+        Linearly interpolated yields at `maturities` (years) for every date.
+        """
+        return pd.DataFrame(
+            interpolate(self.yields, self.maturities, maturities),
+            index=self.index,
+            columns=list(maturities),
+        )
+
+    def lookbacks(self, compare=None):
+        """
+        Curves for "Latest", each LOOKBACKS offset and an optional extra `compare`
+        date, as a frame with one column per timeline. Timelines before the start
+        of the history are left out.
+        """
+        latest = self.index[-1]
+        dates = {"Latest": latest}
+        dates.update({label: latest - offset for label, offset in LOOKBACKS.items()})
+        if compare is not None:
+            dates[pd.Timestamp(compare).strftime("%Y-%m-%d")] = pd.Timestamp(compare)
+
+        curves = {label: self.curve(when) for label, when in dates.items()}
+        return pd.DataFrame({label: c for label, c in curves.items() if c is not None})
+
+
+_engines = OrderedDict()
+_lock = threading.Lock()
+
+
+def curve_engine(df):
+    """
+    YieldCurves for `df`, reused while the data is unchanged.
+    """
+    key = frame_fingerprint(df)
+    with _lock:
+        if key in _engines:
+            _engines.move_to_end(key)
+            return _engines[key]
+
+    engine = YieldCurves(df)
+    with _lock:
+        _engines[key] = engine
+        while len(_engines) > MAX_ENGINES:
+            _engines.popitem(last=False)
+    return engine
+
+
+def clear_engines():
+    """
+    Forgets all cached YieldCurves.
+    """
+    with _lock:
+        _engines.clear()
@@ -1,21 +1,39 @@
+import os
 import ssl
-from matplotlib.dates import relativedelta
-from matplotlib.dates import relativedelta
 import pandas as pd
-import requests
 import streamlit as st
-import datetime
 from datetime import date, timedelta
-from fredapi import Fred
-import yfinance as yf
-from dateutil.relativedelta import relativedelta
+from cache import add_invalidation_hook, swr_cache
+from earnings import event_days, surprise_stats, today, update_calendar
+from fedpath import BACKFILL_DAYS, backfill, cuts_history, is_backfilled, record_chain
+from futures import clear_chain_cache, load_chain, zq_contracts
+from prices import load_universe, update_panel
+from providers import FredClient, fetch_many, fred_request
+from store import update_series
+from telemetry import instrument, record_error
 ssl._create_default_https_context = ssl._create_unverified_context
 
-@st.cache_data(ttl=3600)
-def get_us_yield(lookback):
+def get_fred_key():
+    """
+    FRED API key from the FRED_API_KEY environment variable (offline / replay runs)
+    or the Streamlit secrets.
+    """
+    return os.environ.get("FRED_API_KEY") or st.secrets["fredapikey"]
+
+# Missing FRED prints carried forward at most this many rows (holidays, late
+# releases); longer gaps such as a discontinued tenor stay missing
+FILL_LIMIT = 5
 
-    fred_key = st.secrets["fredapikey"]
-    fred = Fred(api_key=fred_key)
+@instrument("loader")
+@swr_cache(ttl=3600, namespace="treasuries")
+def get_us_yield(lookback=None, filled=True):
+    """
+    US Treasury par yields; the last `lookback` observations per tenor (None = full history).
+    Missing prints are carried forward unless `filled` is False.
+    """
+
+    fred_key = get_fred_key()
+    fred = FredClient(fred_key)
 
     us_yields = {
         "US1M": "DGS1MO",
@@ -24,15 +42,19 @@ def get_us_yield(lookback):
         "US2Y": "DGS2",
         "US5Y": "DGS5",
         "US10Y": "DGS10",
-        "US20Y": "DGS20"
+        "US20Y": "DGS20",
+        "US30Y": "DGS30"
     }
 
-    fred_data = {}
-    for name, series_id in us_yields.items():
-        data = fred.get_series(series_id)
-        fred_data[name] = data.tail(lookback)
-    df = pd.DataFrame(fred_data).ffill()
-    return df
+    # Series are refreshed concurrently; FRED only sends rows newer than the local store
+    series = fetch_many(lambda series_id: update_series(fred, series_id), us_yields.values())
+
+    fred_data = {
+        name: series[series_id].tail(lookback) if lookback else series[series_id]
+        for name, series_id in us_yields.items()
+    }
+    df = pd.DataFrame(fred_data)
+    return df.ffill(limit=FILL_LIMIT) if filled else df
 
 
 IMPORTANT_KEYWORDS = [
@@ -49,63 +71,88 @@ IMPORTANT_KEYWORDS = [
     "Beige Book"
 ]
 
-@st.cache_data(ttl=3600)
-def get_upcoming_releases(api_key, days_ahead=7, only_important=True):
+# Widest window offered by the calendar's "Days Look Ahead" slider
+CALENDAR_MAX_DAYS = 60
+
+# Largest page FRED serves for releases/dates
+CALENDAR_PAGE_SIZE = 1000
+
+@instrument("loader")
+@swr_cache(ttl=3600, namespace="calendar")
+def get_release_calendar(api_key):
     """
-    Fetches upcoming releases and optionally filters for high-impact events.
+    Fetches every release date from today through CALENDAR_MAX_DAYS (all pages),
+    flagging high-impact events once so filtering is a cheap in-memory mask.
     """
-    url = "https://api.stlouisfed.org/fred/releases/dates"
     today = date.today()
-    future_limit = today + timedelta(days=days_ahead)
-    
+    future_limit = today + timedelta(days=CALENDAR_MAX_DAYS)
+
     params = {
-        'api_key': api_key,
-        'file_type': 'json',
         'include_release_dates_with_no_data': 'true',
         'realtime_start': today.strftime('%Y-%m-%d'),
-        'limit': 100,
+        'realtime_end': future_limit.strftime('%Y-%m-%d'),
+        'limit': CALENDAR_PAGE_SIZE,
         'sort_order': 'asc'
     }
 
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'release_dates' in data:
-            df = pd.DataFrame(data['release_dates'])
-            df['date'] = pd.to_datetime(df['date']).dt.date
-            
-            # 1. Date Filter
-            mask = (df['date'] >= today) & (df['date'] <= future_limit)
-            future_df = df.loc[mask].copy()
-            
-            # 2. Importance Filter (The new part)
-            if only_important and not future_df.empty:
-                # Create a regex pattern to match any of the keywords
-                pattern = '|'.join(IMPORTANT_KEYWORDS)
-                future_df = future_df[
-                    future_df['release_name'].str.contains(pattern, case=False, regex=True)
-                ]
-            
-            return future_df[['date', 'release_name', 'release_id']].sort_values('date')
-        
-        return pd.DataFrame()
-        
+        rows = []
+        offset = 0
+        while True:
+            data = fred_request('releases/dates', api_key, offset=offset, **params)
+            page = data.get('release_dates', [])
+            rows.extend(page)
+            offset += len(page)
+            if not page or offset >= int(data.get('count', 0)):
+                break
+
+        if not rows:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(rows)
+        df['date'] = pd.to_datetime(df['date']).dt.date
+        df = df[(df['date'] >= today) & (df['date'] <= future_limit)]
+
+        # Regex over IMPORTANT_KEYWORDS, evaluated once per refresh
+        pattern = '|'.join(IMPORTANT_KEYWORDS)
+        df['important'] = df['release_name'].str.contains(pattern, case=False, regex=True)
+
+        return df[['date', 'release_name', 'release_id', 'important']].sort_values('date')
+
     except Exception as e:
-        print(f"FRED API Error: {e}")
+        record_error("fred", e)
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=3600)
-def get_us_credit(lookback=1500):
+@instrument("loader")
+def get_upcoming_releases(api_key, days_ahead=7, only_important=True):
+    """
+    Upcoming releases within `days_ahead`, optionally only high-impact events.
+    Filters the cached calendar in memory; no network call per slider position.
+    """
+    calendar = get_release_calendar(api_key)
+    if calendar.empty:
+        return pd.DataFrame()
+
+    today = date.today()
+    mask = (calendar['date'] >= today) & (calendar['date'] <= today + timedelta(days=days_ahead))
+    if only_important:
+        mask &= calendar['important']
+
+    return calendar.loc[mask, ['date', 'release_name', 'release_id']]
+
+
+@instrument("loader")
+@swr_cache(ttl=3600, namespace="credit")
+def get_us_credit(lookback=1500, filled=True):
     """
     Fetches ICE BofA Option-Adjusted Spreads (OAS).
-    Returns a DataFrame of the last 'lookback' trading days.
+    Returns a DataFrame of the last 'lookback' trading days (None = full history);
+    missing prints are carried forward unless `filled` is False.
     """
     try:
-        fred_key = st.secrets["fredapikey"]
-        fred = Fred(api_key=fred_key)
+        fred_key = get_fred_key()
+        fred = FredClient(fred_key)
 
         # Correct Tickers for ICE BofA Spreads
         us_yields = {
@@ -114,72 +161,98 @@ def get_us_credit(lookback=1500):
             "AAA Corp (Prime)": "BAMLC0A1CAAA",
         }
 
-        fred_data = {}
-        for name, series_id in us_yields.items():
-            # Fetch all data first
-            fred_data[name] = fred.get_series(series_id)
+        # Full history comes from the local store; FRED only sends new rows
+        series = fetch_many(lambda series_id: update_series(fred, series_id), us_yields.values())
+        fred_data = {name: series[series_id] for name, series_id in us_yields.items()}
             
         # Combine into DataFrame to align dates automatically
-        df = pd.DataFrame(fred_data).ffill()
+        df = pd.DataFrame(fred_data)
+        if filled:
+            df = df.ffill()
         
         # Return the last N days
-        return df.tail(lookback)
+        return df.tail(lookback) if lookback else df
 
     except Exception as e:
-        st.error(f"Error fetching credit data: {e}")
+        record_error("fred", e)
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600)    
-def get_earnings_dates():
+# Widest earnings window offered in the app (days before and after today)
+EARNINGS_MAX_DAYS = 45
+
+# Lowest market-cap floor offered; the stored calendar covers everything above it
+EARNINGS_MIN_MARKET_CAP = 300_000_000
+
+# Earnings section windows (days before and after today)
+EARNINGS_WINDOWS = {"1W": 7, "2W": 14, "1M": 30, "Season": EARNINGS_MAX_DAYS}
+
+# Earnings section market-cap floors
+EARNINGS_MARKET_CAPS = {
+    "$300M+": EARNINGS_MIN_MARKET_CAP,
+    "$2B+": 2_000_000_000,
+    "$10B+": 10_000_000_000,
+    "$200B+": 200_000_000_000,
+}
 
-    calendars = yf.Calendars()
-    start_date = date.today()
-    end_date = start_date + timedelta(days=7)
+@instrument("loader")
+@swr_cache(ttl=3600, namespace="earnings")
+def get_earnings_calendar():
+    """
+    Every US earnings event within EARNINGS_MAX_DAYS of today above
+    EARNINGS_MIN_MARKET_CAP, with sectors. Only days that aren't final are re-fetched.
+    """
+    df = update_calendar(EARNINGS_MAX_DAYS, EARNINGS_MAX_DAYS, EARNINGS_MIN_MARKET_CAP)
+    df = df.assign(**{'Earnings Date': event_days(df['Event Start Date']).dt.date})
+    return df.sort_values(['Earnings Date', 'Marketcap'], ascending=[True, False])
+
+@instrument("loader")
+def get_earnings_dates(days_back=0, days_ahead=7, market_cap=EARNINGS_MIN_MARKET_CAP):
+    """
+    Earnings events from `days_back` days ago through `days_ahead` days ahead for
+    companies of at least `market_cap`. Filters the cached calendar in memory.
+    """
+    calendar = get_earnings_calendar()
+    if calendar.empty:
+        return pd.DataFrame()
 
-    df = calendars.get_earnings_calendar(market_cap=300000000, limit=100, start=start_date, end=end_date)
-    df = df.reset_index()
-    df['Earnings Date'] = pd.to_datetime(df['Event Start Date']).dt.date
-    df = df.sort_values('Earnings Date')
+    now = today().date()
+    mask = (
+        (calendar['Earnings Date'] >= now - timedelta(days=days_back))
+        & (calendar['Earnings Date'] <= now + timedelta(days=days_ahead))
+        & (calendar['Marketcap'] >= market_cap)
+    )
+    columns = ['Symbol', 'Company', 'Sector', 'Event Name', 'Earnings Date', 'EPS Estimate', 'Reported EPS', 'Surprise(%)']
+    return calendar.loc[mask, columns]
 
-    return df[['Symbol', 'Company', 'Event Name', 'Earnings Date', 'EPS Estimate', 'Reported EPS', 'Surprise(%)']]
+def get_earnings_surprises(df):
+    """
+    EPS surprise statistics of a get_earnings_dates() frame: (by sector, by day).
+    """
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    return surprise_stats(df, 'Sector'), surprise_stats(df, 'Earnings Date')
 
-@st.cache_data(ttl=3600)
+@instrument("loader")
+@swr_cache(ttl=3600, namespace="futures")
 def get_fed_futures_data(months_out=12):
 
+    # Current month + N months out, fetched as one batched request
+    contracts = zq_contracts(months_out)
+    prices = load_chain(list(contracts))
 
-    month_codes = {
-        1: 'F', 2: 'G', 3: 'H', 4: 'J', 5: 'K', 6: 'M',
-        7: 'N', 8: 'Q', 9: 'U', 10: 'V', 11: 'X', 12: 'Z'
-    }
-    
-    today = datetime.date.today()
     data_list = []
+    for ticker, target_date in contracts.items():
+        if ticker in prices:
+            last_price = prices[ticker]
+            implied_rate = 100 - last_price
 
-    # Loop for current month + N months out
-    for i in range(months_out + 1):
-        target_date = today + relativedelta(months=+i)
-        m_code = month_codes[target_date.month]
-        y_str = str(target_date.year)[-2:]
-        ticker = f"ZQ{m_code}{y_str}.CBT"
-
-        try:
-            # Get recent data
-            ticker_obj = yf.Ticker(ticker)
-            df = ticker_obj.history(period="5d")
-            
-            if not df.empty:
-                last_price = df['Close'].iloc[-1]
-                implied_rate = 100 - last_price
-                
-                data_list.append({
-                    'Date': target_date,  # Keep as datetime object for sorting/plotting
-                    'Month_Str': target_date.strftime('%b %Y'),
-                    'Ticker': ticker,
-                    'Price': last_price,
-                    'Implied_Rate': implied_rate
-                })
-        except Exception:
-            continue
+            data_list.append({
+                'Date': target_date,  # Keep as datetime object for sorting/plotting
+                'Month_Str': target_date.strftime('%b %Y'),
+                'Ticker': ticker,
+                'Price': last_price,
+                'Implied_Rate': implied_rate
+            })
 
     df_results = pd.DataFrame(data_list)
     
@@ -192,5 +265,42 @@ def get_fed_futures_data(months_out=12):
     # Calculate Cuts (Positive = Cuts, Negative = Hikes)
     df_results['Delta_vs_Spot'] = spot_rate - df_results['Implied_Rate']
     df_results['Cuts_Priced_In'] = df_results['Delta_vs_Spot'] / 0.25
+
+    # Every refresh is also kept in the snapshot store for the history chart
+    try:
+        record_chain(df_results)
+    except Exception as e:
+        record_error("fedpath", e)
     
-    return df_results
\ No newline at end of file
+    return df_results
+
+# Contract quotes are also cached in futures.py; refreshing the source drops them too
+add_invalidation_hook("futures", clear_chain_cache)
+
+@instrument("loader")
+@swr_cache(ttl=3600, namespace="futures")
+def get_fed_futures_history():
+    """
+    Cuts priced in over time (3M / 6M / 12M ahead) from the snapshot store.
+    The store is first seeded from the listed contracts' daily history.
+    """
+    if not is_backfilled():
+        try:
+            backfill(BACKFILL_DAYS)
+        except Exception as e:
+            record_error("yahoo", e)
+
+    return cuts_history()
+
+@instrument("loader")
+@swr_cache(ttl=900, namespace="prices")
+def get_index_prices():
+    """
+    Daily OHLC panel (1y) for the Prices tab universe (see prices.UNIVERSE_PATH).
+    History is kept on disk; only bars after the last stored date are downloaded.
+    """
+    try:
+        return update_panel(load_universe()["ticker"].tolist())
+    except Exception as e:
+        record_error("yahoo", e)
+        return pd.DataFrame()
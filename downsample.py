@@ -0,0 +1,86 @@
+"""
+Server-side downsampling for long time-series charts.
+
+Both methods keep the first and last point of every series. min/max bucketing
+keeps the extreme values of each bucket, so spikes survive at any zoom level.
+LTTB (Largest-Triangle-Three-Buckets) keeps the visually most significant
+point per bucket.
+"""
+import numpy as np
+import pandas as pd
+
+
+def minmax_indices(values, n_buckets):
+    """
+    Positions of the min and max of each of `n_buckets` equal-size buckets (NaN-aware).
+    """
+    values = np.asarray(values, dtype="float64")
+    n = len(values)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)  # ceil
+    padded = np.full(size * n_buckets, np.nan)
+    padded[:n] = values
+    buckets = padded.reshape(n_buckets, size)
+
+    valid = ~np.isnan(buckets)
+    has_data = valid.any(axis=1)
+    mins = np.where(valid, buckets, np.inf).argmin(axis=1)
+    maxs = np.where(valid, buckets, -np.inf).argmax(axis=1)
+
+    offsets = np.arange(n_buckets) * size
+    picked = np.concatenate([(offsets + mins)[has_data], (offsets + maxs)[has_data], [0, n - 1]])
+    return np.unique(picked)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positions selected by Largest-Triangle-Three-Buckets. NaNs in `y` are skipped.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    keep = np.flatnonzero(~np.isnan(y))
+    if len(keep) <= n_out or n_out < 3:
+        return keep
+
+    xs, ys = x[keep], y[keep]
+    edges = np.linspace(1, len(xs) - 1, n_out - 1).astype(int)
+
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the triangle's third vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else len(xs)
+        avg_x = xs[end:next_end].mean() if next_end > end else xs[-1]
+        avg_y = ys[end:next_end].mean() if next_end > end else ys[-1]
+
+        area = np.abs(
+            (xs[a] - avg_x) * (ys[start:end] - ys[a])
+            - (xs[a] - xs[start:end]) * (avg_y - ys[a])
+        )
+        a = start + int(area.argmax())
+        selected.append(a)
+
+    selected.append(len(xs) - 1)
+    return keep[np.asarray(selected)]
+
+
+def downsample_frame(df, max_points, method="minmax"):
+    """
+    Downsamples every column of a time-indexed frame to roughly `max_points` in total
+    and returns the rows selected by any column, so all columns keep a shared x-axis.
+    """
+    if len(df) <= max_points or df.empty:
+        return df
+
+    per_column = max(max_points // max(len(df.columns), 1), 4)
+
+    if method == "lttb":
+        x = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else np.arange(len(df))
+        picked = [lttb_indices(x, df[c].to_numpy(), per_column) for c in df.columns]
+    else:
+        picked = [minmax_indices(df[c].to_numpy(), per_column // 2) for c in df.columns]
+
+    return df.iloc[np.unique(np.concatenate(picked))]
@@ -0,0 +1,300 @@
+"""
+Locally stored US earnings calendar (Yahoo), merged incrementally.
+
+The calendar is kept on disk keyed by (Symbol, Event Start Date). A refresh only
+re-requests the days that are not final yet and pages through each of them in
+full (Yahoo serves at most PAGE_SIZE rows per request), so busy reporting weeks
+are no longer truncated. A day is final once every event on it has a reported
+EPS, or FINAL_AFTER_DAYS after it passed. Fetched rows are merged by key: new
+or changed rows replace the stored ones, events that disappeared from a fetched
+day (rescheduled or cancelled) are dropped, and the file is only rewritten when
+something changed. A chunk that comes back empty although events are stored on
+its days is taken as a failed request: it is neither merged nor marked fetched.
+
+Sectors come from Ticker.info, one request per symbol, and are stored as well,
+so each symbol is only ever looked up once.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from providers import fetch_many, yahoo_earnings_calendar, yahoo_profile
+from store import STORE_DIR, write_frame
+from telemetry import record_error
+
+EARNINGS_DIR = STORE_DIR / "earnings"
+
+KEY = ["Symbol", "Event Start Date"]
+
+COLUMNS = [
+    "Symbol", "Company", "Marketcap", "Event Name", "Event Start Date", "Timing",
+    "EPS Estimate", "Reported EPS", "Surprise(%)",
+]
+
+# Largest page Yahoo serves for the earnings calendar
+PAGE_SIZE = 100
+
+# Safety stop for a single chunk (10,000 events)
+MAX_PAGES = 100
+
+# Days requested per chunk; chunks are fetched concurrently
+CHUNK_DAYS = 7
+
+# A past day is final this long after it passed, even if some EPS never arrive
+FINAL_AFTER_DAYS = 3
+
+# Past events older than this are dropped from the store
+HISTORY_DAYS = 120
+
+# Symbols looked up per refresh (the rest show as "Unknown" until a later one)
+SECTOR_LOOKUPS = 100
+
+UNKNOWN_SECTOR = "Unknown"
+
+_lock = threading.Lock()
+
+
+def _calendar_path():
+    return EARNINGS_DIR / "calendar.parquet"
+
+
+def _days_path():
+    return EARNINGS_DIR / "days.parquet"
+
+
+def _sectors_path():
+    return EARNINGS_DIR / "sectors.parquet"
+
+
+def _read(path, columns):
+    if not path.exists():
+        return pd.DataFrame(columns=columns)
+    return pd.read_parquet(path)
+
+
+def today():
+    """
+    Current US/Eastern date (as a naive midnight timestamp).
+    """
+    return pd.Timestamp(pd.Timestamp.now(tz="America/New_York").date())
+
+
+def event_days(dates):
+    """
+    US/Eastern calendar day of each event start.
+    """
+    dates = pd.to_datetime(dates)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert("America/New_York").dt.tz_localize(None)
+    return dates.dt.normalize()
+
+
+def _normalize(df):
+    df = df.reset_index() if "Symbol" not in df.columns else df
+    df = df.reindex(columns=COLUMNS)
+    df["Event Start Date"] = pd.to_datetime(df["Event Start Date"], utc=True)
+    for column in ("Marketcap", "EPS Estimate", "Reported EPS", "Surprise(%)"):
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    return df.dropna(subset=KEY).drop_duplicates(KEY, keep="last")
+
+
+def fetch_range(start, end, market_cap):
+    """
+    Every event from `start` through `end` (inclusive days) with at least
+    `market_cap`, paging until Yahoo returns a short page. None if a page failed
+    (the error is recorded).
+    """
+    pages = []
+    for page in range(MAX_PAGES):
+        try:
+            # The most-active filter is only applied to the first page, so it is off for all of them
+            df = yahoo_earnings_calendar(
+                market_cap=market_cap,
+                filter_most_active=False,
+                start=start.strftime("%Y-%m-%d"),
+                # Evening events fall on the next UTC day; rows are trimmed to Eastern days below
+                end=(end + pd.Timedelta(days=2)).strftime("%Y-%m-%d"),
+                limit=PAGE_SIZE,
+                offset=page * PAGE_SIZE,
+            )
+        except Exception as e:
+            record_error("yahoo", e)
+            return None
+        if df is None:
+            record_error("yahoo", RuntimeError(f"no earnings page {page} for {start:%Y-%m-%d} to {end:%Y-%m-%d}"))
+            return None
+        if df.empty:
+            break
+        pages.append(df)
+        if len(df) < PAGE_SIZE:
+            break
+
+    if not pages:
+        return _normalize(pd.DataFrame(columns=COLUMNS))
+    df = _normalize(pd.concat(pages))
+    days = event_days(df["Event Start Date"])
+    return df[(days >= start) & (days <= end)]
+
+
+def _final_days(stored, days, now):
+    """
+    Days that don't need fetching again: fetched after FINAL_AFTER_DAYS had passed,
+    or past days on which every stored event has a reported EPS.
+    """
+    settled = days.loc[days["fetched_at"] >= days["day"] + pd.Timedelta(days=FINAL_AFTER_DAYS), "day"]
+
+    fetched_past = days.loc[days["day"] < now, "day"]
+    if stored.empty:
+        reported = fetched_past
+    else:
+        pending = stored["Reported EPS"].isna().groupby(event_days(stored["Event Start Date"])).any()
+        reported = fetched_past[~fetched_past.map(pending).fillna(False).astype(bool)]
+    return set(settled) | set(reported)
+
+
+def merge(stored, fresh, fetched_days):
+    """
+    Applies `fresh` (every event on `fetched_days`) to `stored`. Returns the merged
+    frame and the number of new, changed or removed rows.
+    """
+    stored = stored.set_index(KEY)
+    fresh = fresh.set_index(KEY)
+
+    on_fetched = event_days(stored.index.get_level_values("Event Start Date").to_series()).isin(fetched_days).to_numpy()
+    removed = stored.index[on_fetched].difference(fresh.index)
+
+    common = fresh.index.intersection(stored.index)
+    old, new = stored.loc[common, fresh.columns], fresh.loc[common]
+    differs = ~((old == new) | (old.isna() & new.isna())).all(axis=1)
+    changed = fresh.index.difference(stored.index).union(common[differs.to_numpy()])
+
+    if removed.empty and changed.empty:
+        return stored.reset_index(), 0
+
+    kept = stored.drop(removed.union(changed.intersection(stored.index)))
+    merged = pd.concat([kept, fresh.loc[changed]]).sort_index(level="Event Start Date")
+    return merged.reset_index(), len(removed) + len(changed)
+
+
+def update_calendar(days_back, days_ahead, market_cap):
+    """
+    Brings the stored calendar up to date for today - `days_back` through today +
+    `days_ahead` and returns it with a Sector column.
+    """
+    now = today()
+    window = pd.date_range(now - pd.Timedelta(days=days_back), now + pd.Timedelta(days=days_ahead))
+
+    with _lock:
+        stored = _normalize(_read(_calendar_path(), COLUMNS))
+        days = _read(_days_path(), ["day", "fetched_at"])
+        days = days.astype({"day": "datetime64[ns]", "fetched_at": "datetime64[ns]"})
+
+        final = _final_days(stored, days, now)
+        pending = [day for day in window if day not in final]
+
+        if pending:
+            # Runs of pending days, at most CHUNK_DAYS long
+            chunks = {}
+            for day in pending:
+                chunks.setdefault((day - window[0]).days // CHUNK_DAYS, []).append(day)
+            ranges = [(chunk[0], chunk[-1]) for chunk in chunks.values()]
+            fetched = fetch_many(lambda r: fetch_range(r[0], r[1], market_cap), ranges)
+
+            # A failed chunk, or an empty one where events are stored, keeps the stored
+            # events and its days stay pending for the next refresh
+            stored_days = set(event_days(stored["Event Start Date"]))
+            fresh, pending = [], []
+            for (first, last), df in fetched.items():
+                chunk = chunks[(first - window[0]).days // CHUNK_DAYS]
+                if df is None:
+                    continue
+                if df.empty and stored_days.intersection(chunk):
+                    record_error("yahoo", RuntimeError(f"no earnings returned for {first:%Y-%m-%d} to {last:%Y-%m-%d}"))
+                    continue
+                fresh.append(df)
+                pending += chunk
+
+        if pending:
+            merged, count = merge(stored, pd.concat(fresh, ignore_index=True), pending)
+            merged = merged[event_days(merged["Event Start Date"]) >= now - pd.Timedelta(days=HISTORY_DAYS)]
+            if count or len(merged) != len(stored):
+                write_frame(merged.reset_index(drop=True), _calendar_path())
+            stored = merged
+
+            fetched_at = pd.Timestamp.now(tz="America/New_York").tz_localize(None)
+            days = pd.concat([days[~days["day"].isin(pending)], pd.DataFrame({"day": pending, "fetched_at": fetched_at})])
+            days = days[days["day"] >= now - pd.Timedelta(days=HISTORY_DAYS)]
+            write_frame(days.sort_values("day").reset_index(drop=True), _days_path())
+
+    return with_sectors(stored)
+
+
+def sector_map(symbols):
+    """
+    Symbol -> sector for `symbols`, looking up (at most SECTOR_LOOKUPS) unknown ones.
+    """
+    with _lock:
+        sectors = _read(_sectors_path(), ["Symbol", "Sector", "Industry"])
+        missing = [s for s in dict.fromkeys(symbols) if s not in set(sectors["Symbol"])][:SECTOR_LOOKUPS]
+
+    if missing:
+        def lookup(symbol):
+            try:
+                return yahoo_profile(symbol)
+            except Exception as e:
+                record_error("yahoo", e)
+                return None
+
+        found = [df for df in fetch_many(lookup, missing).values() if df is not None and not df.empty]
+        if found:
+            with _lock:
+                sectors = _read(_sectors_path(), ["Symbol", "Sector", "Industry"])
+                sectors = pd.concat([sectors, *found], ignore_index=True).drop_duplicates("Symbol", keep="last")
+                write_frame(sectors.reset_index(drop=True), _sectors_path())
+
+    return sectors.set_index("Symbol")["Sector"].dropna()
+
+
+def with_sectors(df):
+    """
+    Adds a Sector column (UNKNOWN_SECTOR where Yahoo has none).
+    """
+    if df.empty:
+        return df.assign(Sector=pd.Series(dtype="object"))
+    # Largest companies are looked up first
+    sectors = sector_map(df.sort_values("Marketcap", ascending=False)["Symbol"])
+    return df.assign(Sector=df["Symbol"].map(sectors).fillna(UNKNOWN_SECTOR))
+
+
+def surprise_stats(df, by):
+    """
+    EPS surprise statistics of the reported events in `df`, grouped by `by`
+    ("Sector" or "Earnings Date"): events, reported, beat rate (%), mean and
+    median surprise (%).
+    """
+    reported = df["Reported EPS"].notna()
+    surprise = df["Surprise(%)"].where(reported).astype("float64")
+    frame = pd.DataFrame({
+        by: df[by],
+        "reported": reported,
+        "beat": (surprise > 0) & reported,
+        "surprise": surprise,
+    })
+
+    stats = frame.groupby(by, observed=True).agg(
+        events=("reported", "size"),
+        reported=("reported", "sum"),
+        beats=("beat", "sum"),
+        mean_surprise=("surprise", "mean"),
+        median_surprise=("surprise", "median"),
+    )
+    stats["beat_rate"] = 100 * stats["beats"] / stats["reported"].replace(0, np.nan)
+    stats = stats[stats["reported"] > 0].drop(columns="beats")
+    return stats.rename(columns={
+        "events": "Events",
+        "reported": "Reported",
+        "beat_rate": "Beat Rate (%)",
+        "mean_surprise": "Mean Surprise (%)",
+        "median_surprise": "Median Surprise (%)",
+    })[["Events", "Reported", "Beat Rate (%)", "Mean Surprise (%)", "Median Surprise (%)"]].reset_index()
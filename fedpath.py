@@ -0,0 +1,346 @@
+"""
+Append-only snapshot store for the Fed Funds futures (ZQ) implied path.
+
+Every refresh of the strip is appended as a small Parquet part keyed by
+observation date and contract:
+
+  obs_date        trading day the quote belongs to
+  contract        ZQ ticker (categorical, so Parquet dictionary-encodes it)
+  contract_month  first day of the contract month
+  price           settlement / last price (implied rate = 100 - price)
+  recorded_at     when the row was written; the latest one wins for a key
+  source          "live" or "backfill" (categorical)
+
+Only rows whose price differs from the last stored one for that contract are
+written, so reruns, weekends and unchanged far months add nothing; queries
+forward-fill these change points up to each contract's expiry (the end of its
+month) and only read the contracts they need (Parquet filters). Once enough
+parts pile up they are merged into one (compact) part. Part files are only ever
+created or deleted, never rewritten, so concurrent writers cannot lose each
+other's rows.
+
+    $ python fedpath.py --backfill 365   # seed from the contracts' daily history
+    $ python fedpath.py --compact
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from futures import zq_contracts, zq_ticker
+from providers import yahoo_download
+from store import STORE_DIR, write_frame
+
+FEDPATH_DIR = STORE_DIR / "fedfutures"
+
+COLUMNS = ["obs_date", "contract", "contract_month", "price", "recorded_at", "source"]
+
+# Number of part files that triggers a compaction after an append
+COMPACT_AFTER = 24
+
+# History requested when an empty store is seeded
+BACKFILL_DAYS = 365
+
+# Size of one 25 bp move
+CUT_SIZE = 0.25
+
+_lock = threading.Lock()
+
+
+def session_date(now=None):
+    """
+    Trading day a live quote belongs to (US/Eastern date; weekends roll back to Friday).
+    """
+    now = pd.Timestamp.now(tz="America/New_York") if now is None else pd.Timestamp(now)
+    day = pd.Timestamp(now.date())
+    return day - pd.offsets.BDay(1) if day.weekday() >= 5 else day
+
+
+def _parts():
+    if not FEDPATH_DIR.exists():
+        return []
+    return sorted(FEDPATH_DIR.glob("part-*.parquet"))
+
+
+def _normalize(df):
+    df = df[COLUMNS].copy()
+    df["obs_date"] = pd.to_datetime(df["obs_date"]).dt.normalize()
+    df["contract_month"] = pd.to_datetime(df["contract_month"]).dt.to_period("M").dt.to_timestamp()
+    df["price"] = df["price"].astype("float64")
+    df["recorded_at"] = pd.to_datetime(df["recorded_at"], utc=True)
+    df["contract"] = df["contract"].astype("category")
+    df["source"] = df["source"].astype("category")
+    return df
+
+
+def _write_part(df, tag="snap"):
+    name = f"part-{time.time_ns():020d}-{tag}-{uuid.uuid4().hex[:8]}.parquet"
+    write_frame(df.reset_index(drop=True), FEDPATH_DIR / name, compression="zstd")
+
+
+def is_backfilled():
+    """
+    Whether the store already holds backfilled history (live snapshots alone don't count).
+    """
+    return not read_snapshots(source="backfill").empty
+
+
+def read_snapshots(contracts=None, start=None, end=None, months_from=None, source=None):
+    """
+    Stored change points, one row per (obs_date, contract) with the latest recording,
+    optionally restricted to some contracts, an obs_date range, contract months from
+    `months_from` on, or one source. The restrictions are pushed down to the Parquet reader.
+    """
+    parts = _parts()
+    if not parts:
+        return _normalize(pd.DataFrame(columns=COLUMNS))
+
+    filters = []
+    if contracts is not None:
+        filters.append(("contract", "in", list(contracts)))
+    if start is not None:
+        filters.append(("obs_date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("obs_date", "<=", pd.Timestamp(end)))
+    if months_from is not None:
+        filters.append(("contract_month", ">=", pd.Timestamp(months_from).to_period("M").to_timestamp()))
+    if source is not None:
+        filters.append(("source", "==", source))
+
+    # Parts are read one by one: a compaction may delete some between listing and reading
+    frames = []
+    for path in parts:
+        try:
+            frames.append(pd.read_parquet(path, filters=filters or None))
+        except FileNotFoundError:
+            continue
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+    df = _normalize(df)
+
+    df = df.sort_values("recorded_at").drop_duplicates(["obs_date", "contract"], keep="last")
+    return df.sort_values(["obs_date", "contract_month"]).reset_index(drop=True)
+
+
+def _latest_prices():
+    """
+    Last stored price per contract.
+    """
+    df = read_snapshots()
+    if df.empty:
+        return {}
+    last = df.sort_values("obs_date").drop_duplicates("contract", keep="last")
+    return dict(zip(last["contract"].astype(str), last["price"]))
+
+
+def append_snapshot(df, source="live"):
+    """
+    Appends the rows of `df` (obs_date, contract, contract_month, price) whose price
+    differs from the last stored one for that contract. Returns the number written.
+    """
+    if df is None or df.empty:
+        return 0
+
+    df = df.assign(recorded_at=pd.Timestamp.now(tz="UTC"), source=source)
+    df = _normalize(df)
+
+    with _lock:
+        last = _latest_prices()
+        previous = df["contract"].astype(str).map(last)
+        changed = df[~np.isclose(df["price"], previous.astype("float64"), rtol=0, atol=1e-9)]
+        if changed.empty:
+            return 0
+
+        _write_part(changed)
+        if len(_parts()) > COMPACT_AFTER:
+            compact()
+    return len(changed)
+
+
+def record_chain(chain, now=None):
+    """
+    Appends a get_fed_futures_data() frame as today's live snapshot.
+    """
+    if chain is None or chain.empty:
+        return 0
+    snapshot = pd.DataFrame({
+        "obs_date": session_date(now),
+        "contract": chain["Ticker"],
+        "contract_month": pd.to_datetime(chain["Date"]),
+        "price": chain["Price"],
+    })
+    return append_snapshot(snapshot)
+
+
+def compact():
+    """
+    Merges all current parts into one deduplicated part, then deletes the merged parts.
+    """
+    parts = _parts()
+    if len(parts) < 2:
+        return
+
+    df = read_snapshots()
+    # Re-apply change-point dedup across parts (e.g. a backfill overlapping live rows)
+    df = df.sort_values(["contract", "obs_date"])
+    unchanged = df["contract"].eq(df["contract"].shift()) & df["price"].eq(df["price"].shift())
+    _write_part(df[~unchanged], tag="compact")
+
+    for path in parts:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def backfill_contracts(days=365, months_out=12, today=None):
+    """
+    {ticker: contract month} from the month `days` before `today` through
+    `months_out` months after it, so every backfilled day has its front month.
+    """
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    start = today - pd.Timedelta(days=days)
+    months = (today.year - start.year) * 12 + today.month - start.month + months_out
+    return zq_contracts(months, today=start.date())
+
+
+def backfill(days=365, months_out=12):
+    """
+    Seeds the store with the daily history of the contracts covering the last `days`.
+    """
+    contracts = backfill_contracts(days, months_out)
+    tickers = list(contracts)
+    start = (pd.Timestamp.today() - pd.Timedelta(days=days)).strftime("%Y-%m-%d")
+
+    data = yahoo_download(tickers, start=start, interval="1d", group_by="ticker", auto_adjust=False)
+    if data is None or data.empty:
+        return 0
+
+    frames = []
+    for ticker, month in contracts.items():
+        try:
+            close = data[ticker]["Close"] if isinstance(data.columns, pd.MultiIndex) else data["Close"]
+        except KeyError:
+            continue
+        close = close.dropna()
+        if close.empty:
+            continue
+        # Change points only, like live snapshots
+        close = close[close.ne(close.shift())]
+        frames.append(pd.DataFrame({
+            "obs_date": close.index,
+            "contract": ticker,
+            "contract_month": pd.Timestamp(month),
+            "price": close.to_numpy(),
+        }))
+
+    if not frames:
+        return 0
+    history = pd.concat(frames, ignore_index=True).assign(
+        recorded_at=pd.Timestamp.now(tz="UTC"), source="backfill"
+    )
+    with _lock:
+        _write_part(_normalize(history), tag="backfill")
+    return len(history)
+
+
+def _fill(wide, days):
+    """
+    Prices (obs_date x contract_month change points) on every day of `days`: the
+    last change point carries forward until the contract's month has ended.
+    """
+    wide = wide.reindex(wide.index.union(days)).ffill().reindex(days)
+    expiry = (wide.columns + pd.offsets.MonthEnd(0)).to_numpy()
+    return wide.where(days.to_numpy()[:, None] <= expiry[None, :])
+
+
+def implied_rate_history(contract_month, days=90):
+    """
+    Daily implied rate of one contract month over the last `days` calendar days,
+    e.g. implied_rate_history("2026-06", 90).
+    """
+    month = pd.Timestamp(contract_month).to_period("M").to_timestamp()
+    start = pd.Timestamp.today().normalize() - pd.Timedelta(days=days)
+    # All of the contract's change points: one before the window still sets the level at its start
+    df = read_snapshots(contracts=[zq_ticker(month)])
+    if df.empty:
+        return pd.Series(dtype="float64", name="implied_rate")
+
+    wide = df.pivot(index="obs_date", columns="contract_month", values="price")
+    days_index = pd.bdate_range(max(start, wide.index[0]), pd.Timestamp.today().normalize())
+    return (100 - _fill(wide, days_index)[month]).rename("implied_rate")
+
+
+def daily_path(start=None):
+    """
+    Implied rate per business day (rows) and months ahead of the observation month
+    (columns: 0 = current month), forward-filled between change points.
+    """
+    # Contracts that expired before `start` play no part; older change points of the rest still do
+    df = read_snapshots(months_from=start)
+    if df.empty:
+        return pd.DataFrame()
+
+    wide = df.pivot(index="obs_date", columns="contract_month", values="price")
+    days = pd.bdate_range(wide.index[0], max(wide.index[-1], session_date()))
+    wide = 100 - _fill(wide, days)
+
+    long = wide.stack().rename("implied_rate").reset_index()
+    long.columns = ["obs_date", "contract_month", "implied_rate"]
+    obs, month = long["obs_date"].dt, long["contract_month"].dt
+    long["months_ahead"] = (month.year - obs.year) * 12 + (month.month - obs.month)
+    long = long[long["months_ahead"] >= 0]
+
+    path = long.pivot(index="obs_date", columns="months_ahead", values="implied_rate")
+    if start is not None:
+        path = path[path.index >= pd.Timestamp(start)]
+    return path
+
+
+def cuts_history(horizons=(3, 6, 12), start=None):
+    """
+    Cuts priced in (25 bp steps, positive = cuts) between the current month's
+    contract and the contract `h` months ahead, per business day.
+    """
+    path = daily_path(start)
+    if path.empty or 0 not in path.columns:
+        return pd.DataFrame()
+
+    return pd.DataFrame(
+        {f"{h}M": (path[0] - path[h]) / CUT_SIZE for h in horizons if h in path.columns},
+        index=path.index,
+    ).dropna(how="all")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backfill", type=int, nargs="?", const=BACKFILL_DAYS, metavar="DAYS", help="seed from the contracts' daily history")
+    parser.add_argument("--months-out", type=int, default=12)
+    parser.add_argument("--compact", action="store_true", help="merge all parts into one")
+    args = parser.parse_args()
+
+    status = 0
+    if args.backfill:
+        print(f"backfilled {backfill(args.backfill, args.months_out)} rows")
+        # The history chart needs a front-month contract on every backfilled day
+        start = pd.Timestamp.today().normalize() - pd.Timedelta(days=args.backfill)
+        cuts = cuts_history(start=start)
+        if cuts.empty or cuts.index[0] > start + pd.offsets.BDay(5):
+            first = "nothing" if cuts.empty else f"{cuts.index[0]:%Y-%m-%d}"
+            print(f"error: cuts history starts at {first}, backfill started {start:%Y-%m-%d}")
+            status = 1
+        else:
+            print(f"cuts history {cuts.index[0]:%Y-%m-%d} to {cuts.index[-1]:%Y-%m-%d}")
+    if args.compact:
+        compact()
+    parts = _parts()
+    size = sum(p.stat().st_size for p in parts)
+    print(f"{len(parts)} parts, {size / 1024:.1f} KB, {len(read_snapshots())} rows in {FEDPATH_DIR}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+"""
+Figure-level cache for the plots.py builders.
+
+Builders decorated with @cached_figure are keyed by a cheap hash of their
+DataFrame/Series arguments plus the remaining plot parameters. Built figures are
+compacted (see figcodec) and their JSON is kept in a size-bounded LRU, so a rerun
+with unchanged data skips the pandas reshaping and Plotly figure construction.
+"""
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+from figcodec import compact_figure
+from telemetry import phase, record_cache
+
+MAX_ENTRIES = 32
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def frame_fingerprint(df):
+    """
+    Content hash of a DataFrame/Series (values, index and column labels).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    columns = list(df.columns) if isinstance(df, pd.DataFrame) else [df.name]
+    digest.update(repr((df.shape, columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """
+    Thread-safe LRU of serialized figures, bounded by entry count and total bytes.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # key -> (payload, size)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, payload, size):
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (payload, size)
+            self.nbytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+_figures = FigureCache()
+
+
+def _arg_key(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return ("frame", frame_fingerprint(value))
+    return repr(value)
+
+
+def _compact(result):
+    if isinstance(result, tuple):
+        return tuple(compact_figure(fig) for fig in result)
+    return compact_figure(result)
+
+
+def _serialize(result):
+    if isinstance(result, tuple):
+        return tuple(fig.to_json() for fig in result)
+    return result.to_json()
+
+
+def _deserialize(payload):
+    if isinstance(payload, tuple):
+        return tuple(pio.from_json(p, skip_invalid=True) for p in payload)
+    return pio.from_json(payload, skip_invalid=True)
+
+
+def cached_figure(func):
+    """
+    Caches a builder returning a figure (or a tuple of figures; None is not cached).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (
+            func.__qualname__,
+            tuple(_arg_key(a) for a in args),
+            tuple(sorted((k, _arg_key(v)) for k, v in kwargs.items())),
+        )
+
+        payload = _figures.get(key)
+        if payload is None:
+            record_cache("miss")
+            with phase("build"):
+                result = func(*args, **kwargs)
+            if result is None:
+                return None
+
+            # Typed-array encoding also shrinks what Streamlit sends to the browser
+            with phase("encode"):
+                result = _compact(result)
+            with phase("serialize"):
+                payload = _serialize(result)
+            size = sum(map(len, payload)) if isinstance(payload, tuple) else len(payload)
+            _figures.put(key, payload, size)
+            # The freshly built figure is returned as-is; only hits pay for decoding
+            return result
+
+        record_cache("hit")
+        with phase("decode"):
+            return _deserialize(payload)
+
+    return wrapper
+
+
+def clear_figures():
+    _figures.clear()
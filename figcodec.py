@@ -0,0 +1,71 @@
+"""
+Compact payload encoding for the plots.py figures.
+
+Plotly (>= 6) serializes NumPy arrays as base64 typed arrays ({"dtype", "bdata"}),
+which plotly.js decodes straight into typed arrays instead of parsing JSON number
+lists. compact_figure() makes every trace take that path:
+
+  - numeric value arrays (y, OHLC, z, ...) are cast to float32
+  - datetime x-arrays become float64 epoch milliseconds on a "date" axis
+    (float32 cannot hold millisecond timestamps)
+
+Identical x-arrays in different subplots then serialize to identical byte runs,
+which the websocket's permessage-deflate (.streamlit/config.toml) sends once.
+"""
+import numpy as np
+import pandas as pd
+
+# Trace properties holding numeric data that tolerate float32 precision
+VALUE_FIELDS = ("y", "open", "high", "low", "close", "z")
+
+
+def _trace_value(trace, field):
+    try:
+        return trace[field]
+    except (KeyError, ValueError):
+        return None
+
+
+def _as_datetime(values):
+    array = np.asarray(values)
+    if array.dtype.kind == "M":
+        return pd.DatetimeIndex(array)
+    if array.dtype == object and len(array) and isinstance(array[0], (pd.Timestamp, np.datetime64)):
+        return pd.DatetimeIndex(array)
+    return None
+
+
+def _epoch_ms(index):
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.as_unit("ms").asi8.astype("float64")
+
+
+def compact_figure(fig, dtype="float32"):
+    """
+    Re-encodes the figure's trace arrays in place (see module docstring) and returns it.
+    """
+    date_axes = set()
+
+    for trace in fig.data:
+        for field in VALUE_FIELDS:
+            value = _trace_value(trace, field)
+            if value is None or isinstance(value, str):
+                continue
+            array = np.asarray(value)
+            if array.ndim >= 1 and array.dtype.kind in "fiu":
+                trace[field] = array.astype(dtype)
+
+        x = _trace_value(trace, "x")
+        if x is None or isinstance(x, str):
+            continue
+        dates = _as_datetime(x)
+        if dates is not None:
+            trace["x"] = _epoch_ms(dates)
+            date_axes.add(_trace_value(trace, "xaxis") or "x")
+
+    # Numeric x-values are only read as dates on an explicitly typed date axis
+    for axis in date_axes:
+        fig.layout["xaxis" + axis[1:]].type = "date"
+
+    return fig
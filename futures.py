@@ -0,0 +1,120 @@
+"""
+Fed Funds futures (ZQ) chain loader.
+
+The whole strip is fetched with one batched Yahoo request. Quotes are cached per
+contract, and contracts Yahoo has no data for (far months are often not listed)
+are remembered so they are not requested again on every refresh.
+"""
+import datetime
+import threading
+import time
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from providers import yahoo_download
+from telemetry import record_error
+
+MONTH_CODES = {
+    1: 'F', 2: 'G', 3: 'H', 4: 'J', 5: 'K', 6: 'M',
+    7: 'N', 8: 'Q', 9: 'U', 10: 'V', 11: 'X', 12: 'Z'
+}
+
+# A contract's quote is reused for this long before it is requested again
+QUOTE_TTL = 15 * 60
+
+# Contracts that returned no data are skipped for this long
+MISSING_TTL = 24 * 60 * 60
+
+_quotes = {}   # ticker -> (fetched_at, last close)
+_missing = {}  # ticker -> checked_at
+_lock = threading.Lock()
+
+
+def zq_ticker(month):
+    """
+    Yahoo ticker of the ZQ contract for the month of `month`, e.g. "ZQM26.CBT".
+    """
+    return f"ZQ{MONTH_CODES[month.month]}{str(month.year)[-2:]}.CBT"
+
+
+def zq_contracts(months_out=12, today=None):
+    """
+    Returns {ticker: contract month} for the current month + `months_out` months.
+    """
+    today = today or datetime.date.today()
+
+    contracts = {}
+    for i in range(months_out + 1):
+        target_date = today + relativedelta(months=+i)
+        contracts[zq_ticker(target_date)] = target_date
+    return contracts
+
+
+def _last_closes(tickers):
+    """
+    One batched download for all tickers; returns {ticker: last close} for
+    the tickers that came back with data.
+    """
+    data = yahoo_download(tickers, period="5d", interval="1d", group_by="ticker", auto_adjust=False)
+    if data is None or data.empty:
+        return {}
+
+    closes = {}
+    for ticker in tickers:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                close = data[ticker]['Close'].dropna()
+            else:
+                close = data['Close'].dropna()
+        except KeyError:
+            continue
+
+        if not close.empty:
+            closes[ticker] = float(close.iloc[-1])
+    return closes
+
+
+def load_chain(tickers):
+    """
+    Returns {ticker: last price} for the requested contracts, fetching only the
+    ones without a fresh cached quote that are not known to be missing.
+    """
+    now = time.time()
+    with _lock:
+        to_fetch = [
+            t for t in tickers
+            if not (t in _quotes and now - _quotes[t][0] < QUOTE_TTL)
+            and not (t in _missing and now - _missing[t] < MISSING_TTL)
+        ]
+
+    if to_fetch:
+        try:
+            closes = _last_closes(to_fetch)
+        except Exception as e:
+            record_error("yahoo", e)
+            closes = {}
+
+        with _lock:
+            for ticker, price in closes.items():
+                _quotes[ticker] = (now, price)
+                _missing.pop(ticker, None)
+
+            # An entirely empty response is an outage, not proof that the contracts don't exist
+            if closes:
+                for ticker in to_fetch:
+                    if ticker not in closes:
+                        _missing[ticker] = now
+
+    with _lock:
+        # Stale quotes are still better than dropping a contract from the curve
+        return {t: _quotes[t][1] for t in tickers if t in _quotes}
+
+
+def clear_chain_cache():
+    """
+    Forgets all cached quotes and known-missing contracts.
+    """
+    with _lock:
+        _quotes.clear()
+        _missing.clear()
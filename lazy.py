@@ -0,0 +1,38 @@
+"""
+Deferred imports for modules that are expensive to load (yfinance, plotly, the
+data and plotting layers), so the password prompt renders without them.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stand-in for a module that imports it on first attribute access.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+                module = self._module
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """
+    `yf = lazy_import("yfinance")` behaves like `import yfinance as yf`, but the
+    import only happens when `yf` is first used.
+    """
+    return LazyModule(name)
@@ -1,51 +1,107 @@
-from data import get_us_yield, get_fed_futures_data
+from data import get_us_yield, get_us_credit, get_fed_futures_data, get_fed_futures_history, get_index_prices
+from prices import load_universe, panel_tickers, returns_table
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import yfinance as yf
 import math
+import numpy as np
+import pandas as pd
+from analytics import CORRELATION_WINDOWS, aligned_changes, correlation_groups, cross_asset_stats
+from curves import TENOR_YEARS, curve_engine
+from downsample import downsample_frame
+from figcache import cached_figure
+from rolling import CREDIT_DIFFERENTIALS, ZSCORE_WINDOW, credit_stats, with_differentials
+from telemetry import instrument
 
-def us_treasury_plots():
-    import pandas as pd
-    # Fetch data
-    df = get_us_yield(360)
-    
+# History windows offered by the chart controls (calendar days, None = full record)
+HISTORY_WINDOWS = {"6M": 182, "1Y": 365, "3Y": 1095, "5Y": 1826, "10Y": 3652, "Max": None}
+
+# Points per chart after downsampling (roughly one per horizontal pixel)
+MAX_POINTS = 1500
+
+# Charts with more points than this (all traces) are drawn with WebGL in "auto" render mode
+WEBGL_THRESHOLD = 1000
+
+def window_slice(df, days):
+    """
+    Last `days` calendar days of a time-indexed frame (None = everything).
+    """
+    if days is None or df.empty:
+        return df
+    return df[df.index >= df.index[-1] - pd.Timedelta(days=days)]
+
+def _use_webgl(n_points, render_mode):
+    if render_mode == "auto":
+        return n_points > WEBGL_THRESHOLD
+    return render_mode == "webgl"
+
+@instrument("plot")
+def us_treasury_plots(window_days=365, max_points=MAX_POINTS, render_mode="auto", compare_date=None):
+    """
+    Yield history, curve comparison (plus an optional `compare_date` curve) and
+    spread / butterfly history figures.
+    """
+    # Fetch data (full history; the time series are windowed and downsampled below)
+    df = get_us_yield()
+    fig_ts, fig_spreads = _treasury_history_figures(df, window_days, max_points, render_mode)
+    fig_curve = _curve_figure(df, compare_date)
+    return fig_ts, fig_curve, fig_spreads
+
+@cached_figure
+def _treasury_history_figures(df, window_days=365, max_points=MAX_POINTS, render_mode="auto"):
     # --- CHART 1: Time Series ---
-    fig_ts = px.line(df, x=df.index, y=df.columns,
+    # min/max buckets keep every spike while capping the points sent to the browser
+    df_ts = downsample_frame(window_slice(df, window_days), max_points)
+    fig_ts = px.line(df_ts, x=df_ts.index, y=df_ts.columns,
                 title="US Treasury Yields: Time Series",
                 labels={"value": "Yield(%)", "index": "Date"},
+                render_mode="webgl" if _use_webgl(df_ts.size, render_mode) else "svg",
+                template='plotly_dark')
+
+    # --- CHART 3: Spreads & Butterflies ---
+    engine = curve_engine(df)
+    df_spreads = pd.concat([engine.spreads, engine.butterflies], axis=1)
+    df_spreads = downsample_frame(window_slice(df_spreads, window_days), max_points)
+    fig_spreads = px.line(df_spreads, x=df_spreads.index, y=df_spreads.columns,
+                title="Curve Spreads & Butterflies",
+                labels={"value": "bps", "index": "Date", "variable": "Spread"},
+                render_mode="webgl" if _use_webgl(df_spreads.size, render_mode) else "svg",
                 template='plotly_dark')
+    fig_spreads.add_hline(y=0, line_dash="dot", line_color="gray")
 
+    return fig_ts, fig_spreads
+
+@cached_figure
+def _curve_figure(df, compare_date=None):
     # --- CHART 2: Yield Curve Evolution ---
-    tenor_map = {
-        "US1M": 1/12,
-        "US3M": 0.25, "US1Y": 1.0, "US2Y": 2.0, 
-        "US5Y": 5.0, "US10Y": 10.0, "US20Y": 20.0
-    }
+    # Lookbacks are calendar offsets resolved on the precomputed curves (no refetch)
+    engine = curve_engine(df)
+    tenor_map = {tenor: TENOR_YEARS[tenor] for tenor in engine.tenors}
 
-    # Use iloc safely (ensure df has enough rows)
-    latest = df.iloc[-1]
-    week_ago = df.iloc[-5] if len(df) > 5 else df.iloc[0]
-    month_ago = df.iloc[-25] if len(df) > 25 else df.iloc[0]
-    year_ago = df.iloc[-255] if len(df) > 255 else df.iloc[0]
-
-    curve_data = pd.DataFrame({
-        'Maturity': df.columns,
-        'Latest': latest.values,
-        '1 Week Ago': week_ago.values,
-        '1 Month Ago': month_ago.values,
-        '1 Year Ago': year_ago.values
-    })
-    
-    curve_melted = curve_data.melt(id_vars='Maturity', var_name='Timeline', value_name='Yield')
+    curves = engine.lookbacks(compare_date)
+    curve_melted = curves.rename_axis('Maturity').reset_index().melt(
+        id_vars='Maturity', var_name='Timeline', value_name='Yield'
+    )
     curve_melted['Years'] = curve_melted['Maturity'].map(tenor_map)
 
+    # Timelines before the start of the history are left out by the engine
+    short = {"1 Week Ago": "1W", "1 Month Ago": "1M", "1 Year Ago": "1Y"}
+    title = "US Yield Curve Evolution (" + " vs ".join(short.get(c, c) for c in curves.columns) + ")"
     fig_curve = px.line(curve_melted, 
                 x='Years', y='Yield', color='Timeline', 
                 markers=True,
-                title="US Yield Curve Evolution (Latest vs 1W vs 1M vs 1Y)",
+                title=title,
                 template="plotly_dark",
                 hover_data={'Maturity': True, 'Years': False})
+
+    # Smooth Nelson-Siegel fit through the latest curve
+    maturities = np.linspace(min(tenor_map.values()), max(tenor_map.values()), 120)
+    fitted = engine.fitted_curve(engine.index[-1], maturities)
+    if fitted is not None and fitted.notna().all():
+        fig_curve.add_trace(go.Scatter(
+            x=maturities, y=fitted.values, mode='lines', name='Latest (Nelson-Siegel fit)',
+            line=dict(dash='dot', width=1), hoverinfo='skip'
+        ))
     
     fig_curve.update_layout(
         xaxis = dict(
@@ -55,19 +111,39 @@ def us_treasury_plots():
         )
     )
 
-    # Return both figures as a tuple
-    return fig_ts, fig_curve
+    return fig_curve
 
-def credit_spread_plots(df):
+def _ordinals(values):
+    """
+    Rounded values as ordinals ("1st", "2nd", "13th", ...); NaN as "n/a".
+    """
+    n = values.round()
+    suffix = np.where((n % 100).between(11, 13), "th", n.mod(10).map({1: "st", 2: "nd", 3: "rd"}).fillna("th"))
+    return np.where(n.isna(), "n/a", n.fillna(0).astype(int).astype(str) + suffix)
+
+@instrument("plot")
+@cached_figure
+def credit_spread_plots(df, window_days=None, max_points=MAX_POINTS, render_mode="auto", overlays=True):
     """
     Plots US Corporate Credit Spreads (OAS) in Basis Points (bps) with dual Y-axes.
+    With `overlays`, the HY–BBB / BBB–AAA differentials are drawn dashed, hovers show
+    full-history percentiles and a lower panel shows rolling z-scores.
+    The selected window is downsampled to ~max_points, so long histories stay responsive.
     """
     if df.empty:
         return go.Figure()
 
-    # Create a local copy and convert to Basis Points (x 100)
-    # We use .copy() to avoid modifying the cached dataframe in memory
-    df_bps = df.copy() * 100
+    spreads = list(df.columns)
+    if overlays:
+        # Statistics need the full history; the engine only processes new observations
+        df = with_differentials(df).join(credit_stats(df))
+        spreads += [c for c in CREDIT_DIFFERENTIALS if c in df.columns]
+
+    df = downsample_frame(window_slice(df, window_days), max_points)
+
+    # Convert to Basis Points (x 100); this builds a new frame, the cached one is untouched
+    df_bps = df[spreads] * 100
+    scatter = go.Scattergl if _use_webgl(df_bps.size, render_mode) else go.Scatter
 
     fig = go.Figure()
 
@@ -75,25 +151,49 @@ def credit_spread_plots(df):
     colors = {
         "High Yield (Junk)": "#d62728",     # Red
         "BBB Corp (Inv. Grade)": "#ff7f0e", # Orange
-        "AAA Corp (Prime)": "#2ca02c"       # Green
+        "AAA Corp (Prime)": "#2ca02c",      # Green
+        "HY–BBB": "#9467bd",                # Purple
+        "BBB–AAA": "#8c564b",               # Brown
     }
 
     for column in df_bps.columns:
-        # Assign traces to different Y-axes
-        if column == "High Yield (Junk)":
+        # Assign traces to different Y-axes (differentials go with the leg of similar size)
+        if column in ("High Yield (Junk)", "HY–BBB"):
             yaxis_assignment = "y1" # Primary Y-axis (Left)
         else:
             yaxis_assignment = "y2" # Secondary Y-axis (Right)
 
-        fig.add_trace(go.Scatter(
+        extra = {}
+        if overlays:
+            extra = dict(
+                customdata=_ordinals(df[f"{column} pct"]),
+                hovertemplate="%{y:.0f} bps (%{customdata} pct)",
+            )
+
+        fig.add_trace(scatter(
             x=df_bps.index,
             y=df_bps[column],
             mode='lines',
             name=column,
-            line=dict(width=2, color=colors.get(column, "blue")),
-            yaxis=yaxis_assignment
+            legendgroup=column,
+            line=dict(width=2, color=colors.get(column, "blue"), dash="dash" if column in CREDIT_DIFFERENTIALS else None),
+            yaxis=yaxis_assignment,
+            **extra
         ))
 
+        if overlays:
+            fig.add_trace(scatter(
+                x=df.index,
+                y=df[f"{column} z"],
+                mode='lines',
+                name=f"{column} z",
+                legendgroup=column,
+                showlegend=False,
+                line=dict(width=1, color=colors.get(column, "blue")),
+                hovertemplate="z %{y:.2f}",
+                yaxis="y3"
+            ))
+
     # Update layout with BPS titles
     fig.update_layout(
         title="US Corporate Credit Spreads (OAS)",
@@ -102,6 +202,7 @@ def credit_spread_plots(df):
         # Left Axis (High Yield)
         yaxis=dict(
             title="High Yield Spread (bps)", # <--- Changed to bps
+            domain=[0.32, 1] if overlays else [0, 1],
         ),
         
         # Right Axis (IG / Prime)
@@ -120,15 +221,25 @@ def credit_spread_plots(df):
             x=0.01
         ),
         margin=dict(l=20, r=20, t=50, b=20),
-        height=500
+        height=650 if overlays else 500
     )
+
+    if overlays:
+        # Lower panel: rolling z-scores (ZSCORE_WINDOW observations)
+        fig.update_layout(yaxis3=dict(title=f"{ZSCORE_WINDOW}d z-score", domain=[0, 0.25], zeroline=True))
     
     return fig
 
+@instrument("plot")
 def plot_ff():
 
     df = get_fed_futures_data()
+    if df.empty:
+        return None
+    return _ff_figure(df)
 
+@cached_figure
+def _ff_figure(df):
     fig = make_subplots(specs=[[{"secondary_y": True}]])
 
     # 1. Bar Chart: Cuts Priced In (Left Axis)
@@ -173,33 +284,102 @@ def plot_ff():
 
     return fig
 
-def plot_indexes():
-    """
-    Fetches data and creates a clean grid of candlestick charts.
-    The asset list is embedded here for a cleaner app.py.
-    """
-    # Asset list embedded inside the function
-    macro_assets = {
-        "^GSPC": "S&P 500", 
-        "^IXIC": "Nasdaq 100", 
-        "^FTSE": "FTSE 100",
-        "^STOXX50E": "Euro Stoxx 50", 
-        "URTH": "MSCI World", 
-        "GC=F": "Gold",
-        "SI=F": "Silver", 
-        "GBPUSD=X": "GBP/USD", 
-        "EURUSD=X": "EUR/USD", 
-        "USDJPY=X": "USD/JPY"
-    }
+@instrument("plot")
+def plot_ff_history(window_days=None):
+    """
+    How the cuts priced in by each horizon have moved over time.
+    """
+    df = get_fed_futures_history()
+    if df.empty:
+        return None
+    return _ff_history_figure(window_slice(df, window_days))
 
-    tickers = list(macro_assets.keys())
-    
-    # Download data directly within the function
-    # We use 1y period for a good historical look at the IC meeting
-    data = yf.download(tickers, period="1y", interval="1d", progress=False)
-    
+@cached_figure
+def _ff_history_figure(df):
+    fig = px.line(df, x=df.index, y=df.columns,
+                title="Cuts Priced In Over Time (current month vs N months ahead)",
+                labels={"value": "Total Cuts (25bps)", "obs_date": "Date", "variable": "Horizon"},
+                render_mode="svg")
+    fig.add_hline(y=0, line_dash="dot", line_color="gray")
+    fig.update_layout(hovermode="x unified")
+    return fig
+
+# Instruments drawn as candlesticks per page of the Prices grid
+INDEX_PAGE_SIZE = 12
+
+def index_groups():
+    """
+    Group filter options for the Prices tab ("All" first, then the universe file's order).
+    """
+    return ["All", *load_universe()["group"].unique()]
+
+@instrument("plot")
+def plot_indexes(group="All", page=1, page_size=INDEX_PAGE_SIZE):
+    """
+    Returns (returns heatmap, candlestick grid, page, pages) for one group of the
+    universe. The heatmap covers every instrument in the group; only the
+    instruments on `page` (clamped to 1..pages) are drawn as candlesticks.
+    """
+    data = get_index_prices()
     if data.empty:
-        return None
+        return None, None, 0, 0
+
+    universe = load_universe()
+    universe = universe[universe["ticker"].isin(panel_tickers(data))]
+    if group != "All":
+        universe = universe[universe["group"] == group]
+    if universe.empty:
+        return None, None, 0, 0
+
+    pages = math.ceil(len(universe) / page_size)
+    page = min(max(int(page), 1), pages)
+    visible = universe.iloc[(page - 1) * page_size:page * page_size]
+
+    tickers = data.columns.get_level_values(1)
+    heatmap = _returns_heatmap(
+        returns_table(data.loc[:, tickers.isin(universe["ticker"])]),
+        dict(zip(universe["ticker"], universe["name"])),
+    )
+    grid = _build_index_figure(
+        data.loc[:, tickers.isin(visible["ticker"])],
+        dict(zip(visible["ticker"], visible["name"])),
+    )
+    return heatmap, grid, page, pages
+
+@cached_figure
+def _returns_heatmap(returns, names):
+    """
+    Trailing returns (%) of every instrument, one row each, in `names` order.
+    """
+    returns = returns.reindex(list(names))
+    labels = [f"{name} ({ticker})" for ticker, name in names.items()]
+    limit = np.nanpercentile(np.abs(returns.to_numpy()), 95) if returns.notna().any().any() else 1
+
+    fig = go.Figure(go.Heatmap(
+        z=returns.to_numpy(),
+        x=list(returns.columns),
+        y=labels,
+        colorscale="RdYlGn",
+        zmid=0,
+        zmin=-limit,
+        zmax=limit,
+        texttemplate="%{z:.1f}",
+        hovertemplate="%{y}<br>%{x}: %{z:.2f}%<extra></extra>",
+        colorbar=dict(title="%"),
+    ))
+    fig.update_yaxes(autorange="reversed")
+    fig.update_layout(
+        title="Trailing Returns (%)",
+        template="plotly_dark",
+        height=120 + 22 * len(labels),
+        margin=dict(t=50, b=20, l=20, r=20),
+        font=dict(size=10),
+    )
+    return fig
+
+@cached_figure
+def _build_index_figure(data, macro_assets):
+    tickers = list(macro_assets.keys())
 
     cols = 2
     rows = math.ceil(len(tickers) / cols)
@@ -207,7 +387,7 @@ def plot_indexes():
     fig = make_subplots(
         rows=rows, cols=cols, 
         subplot_titles=[macro_assets[t] for t in tickers],
-        vertical_spacing=0.08, 
+        vertical_spacing=0.08 if rows <= 6 else 0.4 / rows,
         horizontal_spacing=0.05
     )
 
@@ -239,4 +419,55 @@ def plot_indexes():
         margin=dict(t=50, b=20, l=20, r=20),
         font=dict(size=10)
     )
-    return fig
\ No newline at end of file
+    return fig
+
+def correlation_views():
+    """
+    View options of the Correlations tab (see analytics.correlation_groups).
+    """
+    return correlation_groups(load_universe())
+
+@instrument("plot")
+def plot_correlations(window=63, group="Cross-asset"):
+    """
+    Rolling correlation heatmap of the last `window` business days across prices,
+    Treasury yields and credit OAS, and a volatility / beta table, for one view.
+    """
+    panel = get_index_prices()
+    # Unfilled FRED frames: a holiday must stay a gap, not a 0 bp change
+    changes, info = aligned_changes(panel, load_universe(), get_us_yield(filled=False), get_us_credit(lookback=None, filled=False))
+    if changes.empty:
+        return None, pd.DataFrame()
+
+    corr, table = cross_asset_stats(changes, info, window, group)
+    if corr.empty:
+        return None, table
+    return _correlation_heatmap(corr, f"Rolling Correlation ({window} business days to {changes.index[-1]:%b %d, %Y})"), table
+
+@cached_figure
+def _correlation_heatmap(corr, title):
+    labels = list(corr.columns)
+    fig = go.Figure(go.Heatmap(
+        z=corr.to_numpy(),
+        x=labels,
+        y=labels,
+        colorscale="RdBu",
+        reversescale=True,
+        zmin=-1,
+        zmax=1,
+        # Cell labels only while they stay legible
+        texttemplate="%{z:.2f}" if len(labels) <= 30 else None,
+        hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>",
+        colorbar=dict(title="ρ"),
+    ))
+    fig.update_yaxes(autorange="reversed")
+    size = 200 + 24 * len(labels)
+    fig.update_layout(
+        title=title,
+        template="plotly_dark",
+        height=max(size, 400),
+        margin=dict(t=50, b=20, l=20, r=20),
+        font=dict(size=10),
+    )
+    return fig
+
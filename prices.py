@@ -0,0 +1,190 @@
+"""
+Locally stored daily OHLC panel for the Prices tab universe.
+
+The universe (ticker, name, group) is read from a CSV file, UNIVERSE_PATH. The
+panel keeps its history on disk in one frame with (Price, Ticker) columns. Each
+refresh downloads tickers in parallel batches of CHUNK_SIZE and only fetches
+each ticker's bars from its own last stored bar onwards (that bar is
+re-requested since it may have been stored mid-session), so a ticker whose
+batch failed catches up on the next refresh. Tickers new to the universe get a
+full year.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from providers import fetch_many, yahoo_download
+from store import STORE_DIR, write_frame
+from telemetry import record_error
+
+PRICE_DIR = STORE_DIR / "prices"
+
+# ticker,name,group rows; override with MACRO_UNIVERSE
+UNIVERSE_PATH = Path(os.environ.get("MACRO_UNIVERSE", Path(__file__).with_name("universe.csv")))
+
+# Used when the universe file is missing
+MACRO_ASSETS = {
+    "^GSPC": "S&P 500",
+    "^IXIC": "Nasdaq 100",
+    "^FTSE": "FTSE 100",
+    "^STOXX50E": "Euro Stoxx 50",
+    "URTH": "MSCI World",
+    "GC=F": "Gold",
+    "SI=F": "Silver",
+    "GBPUSD=X": "GBP/USD",
+    "EURUSD=X": "EUR/USD",
+    "USDJPY=X": "USD/JPY"
+}
+
+# How much history the panel keeps
+PANEL_HISTORY = pd.DateOffset(years=1)
+
+# Tickers per Yahoo download request
+CHUNK_SIZE = 50
+
+# Trailing-return horizons of the returns table ("YTD" = since the last close of the
+# previous year). Nothing longer: the panel only holds PANEL_HISTORY.
+RETURN_HORIZONS = {
+    "1D": pd.DateOffset(days=1),
+    "1W": pd.DateOffset(weeks=1),
+    "1M": pd.DateOffset(months=1),
+    "3M": pd.DateOffset(months=3),
+    "6M": pd.DateOffset(months=6),
+    "YTD": None,
+}
+
+
+def load_universe(path=None):
+    """
+    The configured instruments as a frame of ticker, name and group, in file order.
+    """
+    path = Path(path or UNIVERSE_PATH)
+    if not path.exists():
+        return pd.DataFrame({"ticker": list(MACRO_ASSETS), "name": list(MACRO_ASSETS.values()), "group": "Markets"})
+
+    universe = pd.read_csv(path, dtype=str, comment="#").dropna(subset=["ticker"])
+    universe["ticker"] = universe["ticker"].str.strip()
+    universe["name"] = universe["name"].fillna(universe["ticker"])
+    universe["group"] = universe["group"].fillna("Other")
+    return universe.drop_duplicates("ticker").reset_index(drop=True)
+
+
+def _panel_path(name):
+    return PRICE_DIR / f"{name}.parquet"
+
+
+def read_panel(name):
+    """
+    Returns the stored (Price, Ticker) column panel, or an empty DataFrame.
+    """
+    path = _panel_path(name)
+    if not path.exists():
+        return pd.DataFrame()
+    return pd.read_parquet(path)
+
+
+def panel_tickers(panel):
+    if panel.empty:
+        return set()
+    return set(panel.columns.get_level_values(1))
+
+
+def _chunks(items, size):
+    return [tuple(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def download_panel(tickers, **kwargs):
+    """
+    Downloads `tickers` in parallel CHUNK_SIZE batches into one (Price, Ticker)
+    panel. A failed batch is recorded and left out.
+    """
+    def download(chunk):
+        try:
+            df = yahoo_download(list(chunk), **kwargs)
+        except Exception as e:
+            record_error("yahoo", e)
+            return None
+        if df is None or df.empty:
+            return None
+        if not isinstance(df.columns, pd.MultiIndex):
+            # Single-ticker downloads may come back with flat columns
+            df.columns = pd.MultiIndex.from_product([df.columns, chunk])
+        return df
+
+    frames = [df for df in fetch_many(download, _chunks(list(tickers), CHUNK_SIZE)).values() if df is not None]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1).dropna(how="all")
+
+
+def update_panel(tickers, name="macro"):
+    """
+    Brings the stored panel for `tickers` up to date and returns it (columns of
+    tickers no longer requested are dropped).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    stored = read_panel(name)
+    if not stored.empty:
+        stored = stored.loc[:, stored.columns.get_level_values(1).isin(tickers)]
+
+    # Tickers grouped by their last stored bar (usually one or two dates)
+    last_bars = stored["Close"].apply(pd.Series.last_valid_index) if not stored.empty else pd.Series(dtype=object)
+    resume = {}
+    new = []
+    for ticker in tickers:
+        last = last_bars.get(ticker)
+        if last is None or pd.isna(last):
+            new.append(ticker)
+        else:
+            resume.setdefault(last, []).append(ticker)
+
+    parts = []
+    if new:
+        parts.append(download_panel(new, period="1y", interval="1d"))
+    for start, group in sorted(resume.items()):
+        parts.append(download_panel(group, start=start.strftime("%Y-%m-%d"), interval="1d"))
+
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return stored
+
+    # Fresh bars win; older history (and tickers whose batch failed) comes from the store
+    combined = pd.concat(parts, axis=1)
+    if not stored.empty:
+        combined = combined.combine_first(stored)
+
+    combined = combined.sort_index()
+    combined = combined[combined.index >= combined.index[-1] - PANEL_HISTORY]
+
+    if not combined.equals(stored):
+        write_frame(combined, _panel_path(name))
+
+    return combined
+
+
+def returns_table(panel, horizons=RETURN_HORIZONS):
+    """
+    Trailing returns (%) per ticker (rows) and horizon (columns) from the panel's
+    closes, each measured from the last close on or before the horizon start.
+    """
+    if panel.empty:
+        return pd.DataFrame(columns=list(horizons))
+
+    close = panel["Close"].ffill()
+    dates = close.index.to_numpy()
+    values = close.to_numpy(dtype="float64")
+    last_date = close.index[-1]
+
+    starts = [
+        pd.Timestamp(last_date.year, 1, 1) - pd.Timedelta(days=1) if offset is None else last_date - offset
+        for offset in horizons.values()
+    ]
+    # Row of the last close on or before each start (-1 = before the stored history)
+    rows = np.searchsorted(dates, np.array(starts, dtype=dates.dtype), side="right") - 1
+    base = np.where(rows[:, None] >= 0, values[np.clip(rows, 0, None)], np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = 100 * (values[-1] / base - 1)
+    return pd.DataFrame(returns.T, index=close.columns, columns=list(horizons))
@@ -0,0 +1,268 @@
+"""
+Shared provider layer for FRED and Yahoo requests.
+
+All network calls from data.py go through here so that independent requests run
+concurrently on one bounded thread pool, HTTP connections are pooled and reused,
+and FRED calls stay under the per-key rate limit.
+
+MACRO_PROVIDER_MODE selects where responses come from:
+  live   - the real FRED / Yahoo APIs (default)
+  record - the real APIs, saving every response to MACRO_FIXTURE_DIR
+  replay - the local stand-in server (standin.py) at MACRO_STANDIN_URL
+"""
+import contextvars
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from lazy import lazy_import
+from telemetry import record_bytes
+
+# Only loaded when a Yahoo endpoint is first used (it is slow to import)
+yf = lazy_import("yfinance")
+
+FRED_BASE_URL = "https://api.stlouisfed.org/fred/"
+
+PROVIDER_MODE = os.environ.get("MACRO_PROVIDER_MODE", "live")
+FIXTURE_DIR = Path(os.environ.get("MACRO_FIXTURE_DIR", "fixtures"))
+STANDIN_URL = os.environ.get("MACRO_STANDIN_URL", "http://127.0.0.1:8765/")
+
+# Request parameters that never identify a fixture (credentials / format)
+_UNKEYED_PARAMS = {"api_key", "file_type"}
+
+# Upper bound on concurrent provider requests (also the HTTP pool size)
+MAX_WORKERS = 8
+
+# FRED allows 120 requests per minute per API key
+FRED_RATE_LIMIT = 120
+FRED_RATE_PERIOD = 60.0
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (3.05, 30)
+
+# Per-request timeout handed to yfinance downloads, in seconds
+YAHOO_TIMEOUT = 10
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="provider")
+
+_session = None
+_session_lock = threading.Lock()
+
+_fred_limiters = {}
+_fred_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: at most `rate` acquisitions per `period` seconds.
+    """
+
+    def __init__(self, rate, period):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                refill = (now - self._updated) * self.rate / self.period
+                self._tokens = min(self.rate, self._tokens + refill)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.period / self.rate
+            time.sleep(wait)
+
+
+def get_session():
+    """
+    Returns the process-wide pooled HTTP session (created on first use).
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def fetch_many(func, items):
+    """
+    Runs func(item) for every item on the shared pool.
+    Returns {item: result} in input order; the first exception is re-raised.
+    """
+    # Each task runs in a copy of the caller's context so telemetry lands on the caller's span
+    futures = {item: _executor.submit(contextvars.copy_context().run, func, item) for item in items}
+    return {item: future.result() for item, future in futures.items()}
+
+
+# --- Record / replay ---
+
+def fixture_params(params):
+    """
+    Normalizes request parameters the way they arrive at the stand-in (all strings).
+    """
+    return {k: str(v) for k, v in sorted(params.items()) if k not in _UNKEYED_PARAMS}
+
+
+def fixture_key(source, name, params):
+    """
+    File stem under which a response is recorded, e.g. "fred-series_observations-<hash>".
+    """
+    blob = json.dumps([source, name, fixture_params(params)], sort_keys=True)
+    digest = hashlib.sha1(blob.encode()).hexdigest()[:16]
+    return f"{source}-{name.replace('/', '_')}-{digest}"
+
+
+def _record(source, name, params, body, suffix):
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    key = fixture_key(source, name, params)
+    meta = {
+        "source": source,
+        "name": name,
+        "params": fixture_params(params),
+        "file": key + suffix,
+        "recorded_at": time.time(),
+    }
+    (FIXTURE_DIR / (key + suffix)).write_bytes(body)
+    (FIXTURE_DIR / (key + ".meta.json")).write_text(json.dumps(meta, indent=2))
+
+
+def _frame_to_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    return buffer.getvalue()
+
+
+def _replay_frame(name, params):
+    """
+    Fetches a recorded Yahoo frame from the stand-in server.
+    """
+    response = get_session().get(
+        STANDIN_URL + "yahoo/" + name,
+        params={"params": json.dumps(fixture_params(params))},
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    record_bytes(len(response.content))
+    return pd.read_parquet(io.BytesIO(response.content))
+
+
+# --- FRED ---
+
+def _fred_limiter(api_key):
+    with _fred_limiters_lock:
+        if api_key not in _fred_limiters:
+            _fred_limiters[api_key] = RateLimiter(FRED_RATE_LIMIT, FRED_RATE_PERIOD)
+        return _fred_limiters[api_key]
+
+
+def fred_request(endpoint, api_key, **params):
+    """
+    GETs a FRED API endpoint (e.g. "series/observations") and returns the JSON body.
+    """
+    _fred_limiter(api_key).acquire()
+
+    # The stand-in mimics the FRED REST API under /fred/
+    base_url = STANDIN_URL + "fred/" if PROVIDER_MODE == "replay" else FRED_BASE_URL
+
+    params = {**params, "api_key": api_key, "file_type": "json"}
+    response = get_session().get(base_url + endpoint, params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    record_bytes(len(response.content))
+
+    if PROVIDER_MODE == "record":
+        _record("fred", endpoint, params, response.content, ".json")
+    return response.json()
+
+
+class FredClient:
+    """
+    Minimal FRED client exposing the fredapi.Fred.get_series() call we use,
+    backed by the pooled, rate-limited session above.
+    """
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def get_series(self, series_id, observation_start=None):
+        params = {"series_id": series_id}
+        if observation_start:
+            params["observation_start"] = observation_start
+
+        data = fred_request("series/observations", self.api_key, **params)
+        observations = data.get("observations", [])
+        if not observations:
+            return pd.Series(dtype="float64", name=series_id)
+
+        df = pd.DataFrame(observations)
+        # FRED marks missing observations with "."
+        values = pd.to_numeric(df["value"], errors="coerce")
+        return pd.Series(values.values, index=pd.to_datetime(df["date"]), name=series_id)
+
+
+# --- Yahoo ---
+
+def _yahoo_frame(name, fetch, params):
+    if PROVIDER_MODE == "replay":
+        return _replay_frame(name, params)
+
+    df = fetch()
+    if df is not None:
+        # yfinance doesn't expose the raw payload; the decoded frame size is the closest proxy
+        record_bytes(int(df.memory_usage(deep=True).sum()))
+    if PROVIDER_MODE == "record" and df is not None:
+        _record("yahoo", name, params, _frame_to_bytes(df), ".parquet")
+    return df
+
+
+def yahoo_download(tickers, **kwargs):
+    """
+    Batched price download for several Yahoo tickers (one request per batch).
+    """
+    params = {"tickers": json.dumps(list(tickers)), **kwargs}
+    return _yahoo_frame(
+        "download", lambda: yf.download(tickers, progress=False, timeout=YAHOO_TIMEOUT, **kwargs), params
+    )
+
+
+def yahoo_earnings_calendar(**kwargs):
+    """
+    Yahoo earnings calendar (see yf.Calendars.get_earnings_calendar for arguments).
+    """
+    return _yahoo_frame("earnings", lambda: yf.Calendars().get_earnings_calendar(**kwargs), kwargs)
+
+
+def yahoo_profile(symbol):
+    """
+    One-row frame with a ticker's Symbol, Sector and Industry (from Ticker.info).
+    """
+    def fetch():
+        info = yf.Ticker(symbol).info or {}
+        return pd.DataFrame([{"Symbol": symbol, "Sector": info.get("sector"), "Industry": info.get("industry")}])
+
+    return _yahoo_frame("profile", fetch, {"symbol": symbol})
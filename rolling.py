@@ -0,0 +1,225 @@
+"""
+Incremental rolling statistics for long daily series (credit spreads).
+
+The first call computes everything with vectorized pandas over the full
+history and keeps the window state. Later calls only push the observations
+that arrived since: O(1) for the rolling mean / std (running sums), and for
+percentile ranks an O(log n) bisect plus an O(n) list insert (a memmove of
+the sorted history, microseconds for decades of daily data):
+
+  z        rolling z-score over the last `window` observations
+  pct      percentile rank (0-100) within the full history up to that date
+
+If earlier rows change (a FRED revision), the state is rebuilt from scratch.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+# Observations in the z-score window (~1 year of business days)
+ZSCORE_WINDOW = 252
+
+# Trailing rows compared to detect revisions of already processed data
+REVISION_CHECK_ROWS = 10
+
+# Engines kept for different frames (e.g. the full history and a lookback tail)
+MAX_ENGINES = 4
+
+
+class RollingWindow:
+    """
+    Last `size` values with running sums (mean / std in O(1)).
+    """
+
+    def __init__(self, size, values=()):
+        self.size = size
+        self.values = deque(values, maxlen=size)
+        self._resum()
+
+    def _resum(self):
+        # Exact sums every `size` pushes keep the running sums from drifting
+        self.total = float(np.sum(self.values)) if self.values else 0.0
+        self.total_sq = float(np.sum(np.square(self.values))) if self.values else 0.0
+        self._pushes = 0
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._resum()
+
+    def zscore(self, value):
+        n = len(self.values)
+        if n < self.size:
+            return np.nan
+        mean = self.total / n
+        var = max(self.total_sq - n * mean * mean, 0.0) / (n - 1)
+        return (value - mean) / np.sqrt(var) if var > 0 else np.nan
+
+
+class SortedHistory:
+    """
+    Every value seen so far in sorted order; percentile ranks by binary search.
+    """
+
+    def __init__(self, values=()):
+        self.values = sorted(values)
+
+    def push(self, value):
+        insort(self.values, value)
+
+    def percentile(self, value):
+        # Average rank of ties, like pandas rank(method="average", pct=True)
+        left, right = bisect_left(self.values, value), bisect_right(self.values, value)
+        return 100 * (left + right + 1) / 2 / len(self.values)
+
+
+class SeriesStats:
+    """
+    Window state and results for one series.
+    """
+
+    def __init__(self, series, window):
+        # Cached frames may be float32; the running sums are kept in float64
+        values = series.dropna().astype("float64")
+        z = (values - values.rolling(window).mean()) / values.rolling(window).std()
+        pct = values.expanding().rank(pct=True) * 100
+
+        self.window = RollingWindow(window, values.to_numpy()[-window:])
+        self.history = SortedHistory(values.to_numpy())
+        self.z = z.reindex(series.index).to_numpy()
+        self.pct = pct.reindex(series.index).to_numpy()
+
+    def push(self, value):
+        if np.isnan(value):
+            return np.nan, np.nan
+        self.window.push(value)
+        self.history.push(value)
+        return self.window.zscore(value), self.history.percentile(value)
+
+
+class RollingStats:
+    """
+    Incrementally maintained z-scores and percentile ranks for every column of a
+    growing time-indexed frame. update(df) returns a frame with "<column> z" and
+    "<column> pct" columns.
+    """
+
+    def __init__(self, window=ZSCORE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.processed = None  # frame the state corresponds to
+        self.series = {}
+        self.result = pd.DataFrame()
+
+    def _extends(self, df):
+        # True if `df` is the processed frame plus new rows at the end
+        seen = self.processed
+        if seen is None or list(df.columns) != list(seen.columns) or len(df) < len(seen):
+            return False
+        n = len(seen)
+        head = df.iloc[max(n - REVISION_CHECK_ROWS, 0):n]
+        return head.index.equals(seen.index[-len(head):]) and np.allclose(
+            head.to_numpy(), seen.iloc[-len(head):].to_numpy(), equal_nan=True
+        )
+
+    def _rebuild(self, df):
+        self.series = {c: SeriesStats(df[c], self.window) for c in df.columns}
+        self.result = self._frame(df.index, {c: (s.z, s.pct) for c, s in self.series.items()})
+        self.processed = df
+
+    def _frame(self, index, columns):
+        data = {}
+        for column, (z, pct) in columns.items():
+            data[f"{column} z"] = z
+            data[f"{column} pct"] = pct
+        return pd.DataFrame(data, index=index)
+
+    def update(self, df):
+        with self._lock:
+            if df.empty:
+                self._reset()
+                return self.result
+
+            if not self._extends(df):
+                self._rebuild(df)
+                return self.result
+
+            new = df.iloc[len(self.processed):]
+            if not new.empty:
+                columns = {}
+                for column, stats in self.series.items():
+                    pushed = [stats.push(v) for v in new[column].to_numpy(dtype="float64")]
+                    columns[column] = ([z for z, _ in pushed], [p for _, p in pushed])
+                self.result = pd.concat([self.result, self._frame(new.index, columns)])
+                self.processed = df
+            return self.result
+
+
+# --- Credit spreads ---
+
+# name -> (wider leg, tighter leg)
+CREDIT_DIFFERENTIALS = {
+    "HY–BBB": ("High Yield (Junk)", "BBB Corp (Inv. Grade)"),
+    "BBB–AAA": ("BBB Corp (Inv. Grade)", "AAA Corp (Prime)"),
+}
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def stats_engine(df, window=ZSCORE_WINDOW):
+    """
+    Shared RollingStats for frames with `df`'s columns and first date: a frame that
+    only grows keeps its engine, another lookback of the same data gets its own
+    (least recently used beyond MAX_ENGINES dropped).
+    """
+    key = (tuple(df.columns), df.index[0] if len(df) else None, window)
+    with _engines_lock:
+        engine = _engines.pop(key, None) or RollingStats(window)
+        _engines[key] = engine
+        while len(_engines) > MAX_ENGINES:
+            _engines.popitem(last=False)
+    return engine
+
+
+def with_differentials(df):
+    """
+    Adds the CREDIT_DIFFERENTIALS columns (same units as the input) to an OAS frame.
+    """
+    extra = {
+        name: df[wide] - df[tight]
+        for name, (wide, tight) in CREDIT_DIFFERENTIALS.items()
+        if wide in df.columns and tight in df.columns
+    }
+    return df.assign(**extra)
+
+
+def credit_stats(df):
+    """
+    Rolling z-scores and full-history percentiles for the get_us_credit() spreads and
+    their differentials. Only observations added since the last call are processed.
+    """
+    df = with_differentials(df)
+    return stats_engine(df).update(df)
+
+
+def clear_engines():
+    """
+    Forgets all rolling window state.
+    """
+    with _engines_lock:
+        _engines.clear()
@@ -0,0 +1,61 @@
+"""
+Payloads of the dashboard sections: each loader fetches through data.py and builds
+the figures / tables its section renders. Used by app.py to render live and by
+snapshot.py to pre-build them. Control values arrive as keyword arguments.
+"""
+from lazy import lazy_import
+
+# Importing this module stays cheap (app.py imports it before the password prompt)
+data = lazy_import("data")
+plots = lazy_import("plots")
+
+# Initial value of every app control (snapshots are built for these)
+DEFAULTS = {
+    "days_ahead": 14,
+    "show_important": True,
+    "treasury_window": "1Y",
+    "compare_date": None,
+    "ff_window": "6M",
+    "credit_window": "5Y",
+    "earnings_window": "1W",
+    "earnings_cap": "$300M+",
+    "prices_group": "All",
+    "prices_page": 1,
+    "corr_window": "3M",
+    "corr_view": "Cross-asset",
+}
+
+
+def load_earnings(earnings_window, earnings_cap):
+    days = data.EARNINGS_WINDOWS[earnings_window]
+    df = data.get_earnings_dates(days_back=days, days_ahead=days, market_cap=data.EARNINGS_MARKET_CAPS[earnings_cap])
+    return df, *data.get_earnings_surprises(df)
+
+
+def load_treasury(treasury_window, compare_date):
+    return plots.us_treasury_plots(window_days=plots.HISTORY_WINDOWS[treasury_window], compare_date=compare_date)
+
+
+def load_credit(credit_window):
+    # Full FRED record; the chart is windowed and downsampled
+    df_credit = data.get_us_credit(lookback=None)
+    if df_credit.empty:
+        return df_credit, None
+    return df_credit, plots.credit_spread_plots(df_credit, window_days=plots.HISTORY_WINDOWS[credit_window])
+
+
+def load_fed_futures(ff_window):
+    return plots.plot_ff(), plots.plot_ff_history(window_days=plots.HISTORY_WINDOWS[ff_window])
+
+
+def load_calendar(days_ahead, show_important):
+    fred_key = data.get_fred_key()
+    return data.get_upcoming_releases(fred_key, days_ahead=days_ahead, only_important=show_important)
+
+
+def load_prices(prices_group, prices_page):
+    return plots.plot_indexes(group=prices_group, page=prices_page)
+
+
+def load_correlations(corr_window, corr_view):
+    return plots.plot_correlations(window=plots.CORRELATION_WINDOWS[corr_window], group=corr_view)
@@ -0,0 +1,284 @@
+"""
+Headless builder for pre-rendered dashboard sections.
+
+Runs every section loader (sections.py) once for the default control values and
+writes the results as a versioned snapshot:
+
+  <SNAPSHOT_DIR>/<version>/manifest.json     sections, their inputs and payload layout
+                                             (plain values such as page counts inline)
+  <SNAPSHOT_DIR>/<version>/figures/*.json    Plotly figures
+  <SNAPSHOT_DIR>/<version>/tables/*.parquet  DataFrames
+  <SNAPSHOT_DIR>/LATEST                      name of the newest complete version
+
+A version directory is written under a temporary name and renamed when complete,
+then LATEST is swapped atomically, so readers never see a partial snapshot.
+
+app.py serves a section from the latest snapshot when it is younger than
+MAX_AGE and was built for the control values on screen; anything else is loaded
+live. Decoded payloads are shared by every session of the process.
+
+    $ python snapshot.py                # build once
+    $ python snapshot.py --every 15m    # keep building (cron / sidecar)
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import sections
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+pio = lazy_import("plotly.io")
+
+# Same default as store.STORE_DIR (store.py is not imported here: it loads pandas)
+SNAPSHOT_DIR = Path(
+    os.environ.get("MACRO_SNAPSHOT_DIR")
+    or Path(os.environ.get("MACRO_STORE_DIR", ".store")) / "snapshots"
+)
+
+# Seconds after which the app stops serving a snapshot and loads live again
+MAX_AGE = float(os.environ.get("MACRO_SNAPSHOT_MAX_AGE", 3600))
+
+# Complete versions kept on disk (older ones are deleted after each build)
+KEEP_VERSIONS = 3
+
+# Section title -> (loader, inputs); titles and inputs match the sections in app.py
+SECTIONS = {
+    "Yields & Curve": (sections.load_treasury, ("treasury_window", "compare_date")),
+    "Credit Spreads": (sections.load_credit, ("credit_window",)),
+    "Fed Funds Futures": (sections.load_fed_futures, ("ff_window",)),
+    "Prices": (sections.load_prices, ("prices_group", "prices_page")),
+    "Correlations": (sections.load_correlations, ("corr_window", "corr_view")),
+    "Economic Calendar": (sections.load_calendar, ("days_ahead", "show_important")),
+    "Earnings": (sections.load_earnings, ("earnings_window", "earnings_cap")),
+}
+
+_lock = threading.Lock()
+_manifest = None        # (LATEST mtime, manifest) of the current snapshot
+_payloads = {}          # (version, title) -> decoded payload
+
+
+# --- Writing ---
+
+def _jsonable(values):
+    """
+    Control values as stored in the manifest (dates become ISO strings).
+    """
+    return {
+        name: value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value
+        for name, value in values.items()
+    }
+
+
+def _encode(value, directory, name):
+    """
+    Writes the frames and figures of a section payload and returns its layout.
+    """
+    if value is None:
+        return {"type": "none"}
+    if isinstance(value, tuple):
+        return {"type": "tuple", "items": [_encode(v, directory, f"{name}-{i}") for i, v in enumerate(value)]}
+    if isinstance(value, pd.DataFrame):
+        path = Path("tables") / f"{name}.parquet"
+        (directory / path).parent.mkdir(exist_ok=True)
+        value.to_parquet(directory / path)
+        return {"type": "table", "file": str(path)}
+    if isinstance(value, (bool, int, float, str)):
+        return {"type": "value", "value": value}
+    if hasattr(value, "to_plotly_json"):
+        path = Path("figures") / f"{name}.json"
+        (directory / path).parent.mkdir(exist_ok=True)
+        (directory / path).write_text(pio.to_json(value, validate=False))
+        return {"type": "figure", "file": str(path)}
+    raise TypeError(f"can't snapshot {type(value).__name__}")
+
+
+def _slug(title):
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def _write_pointer(version):
+    tmp = SNAPSHOT_DIR / f".LATEST.{os.getpid()}.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, SNAPSHOT_DIR / "LATEST")
+
+
+def prune(keep=KEEP_VERSIONS):
+    """
+    Deletes all but the newest `keep` versions (and leftovers of failed builds).
+    """
+    if not SNAPSHOT_DIR.exists():
+        return
+    latest = (SNAPSHOT_DIR / "LATEST").read_text().strip() if (SNAPSHOT_DIR / "LATEST").exists() else None
+    versions = sorted(p for p in SNAPSHOT_DIR.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for path in versions[:-keep] if keep else versions:
+        if path.name != latest:
+            shutil.rmtree(path, ignore_errors=True)
+    for path in SNAPSHOT_DIR.glob(".build-*"):
+        if time.time() - path.stat().st_mtime > 3600:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def build(keep=KEEP_VERSIONS):
+    """
+    Loads every section and publishes the results as the latest snapshot.
+    Returns the manifest; sections that failed are listed under "errors".
+    """
+    version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    building = SNAPSHOT_DIR / f".build-{version}-{os.getpid()}"
+    building.mkdir(parents=True)
+
+    def load(title):
+        loader, inputs = SECTIONS[title]
+        values = {name: sections.DEFAULTS[name] for name in inputs}
+        start = time.perf_counter()
+        payload = loader(**values)
+        return values, payload, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=len(SECTIONS), thread_name_prefix="snapshot") as pool:
+        futures = {title: pool.submit(load, title) for title in SECTIONS}
+
+    manifest = {"version": version, "created_at": time.time(), "sections": {}, "errors": {}}
+    for title, future in futures.items():
+        try:
+            values, payload, seconds = future.result()
+            manifest["sections"][title] = {
+                "inputs": _jsonable(values),
+                "payload": _encode(payload, building, _slug(title)),
+                "seconds": round(seconds, 3),
+            }
+        except Exception as e:
+            manifest["errors"][title] = repr(e)
+
+    if not manifest["sections"]:
+        # Nothing loaded: keep serving the previous snapshot
+        shutil.rmtree(building, ignore_errors=True)
+        return manifest
+
+    (building / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    os.replace(building, SNAPSHOT_DIR / version)
+    _write_pointer(version)
+    prune(keep)
+    return manifest
+
+
+# --- Serving ---
+
+def current():
+    """
+    Manifest of the latest snapshot, or None. Costs one stat() while it is unchanged.
+    """
+    global _manifest
+    pointer = SNAPSHOT_DIR / "LATEST"
+    try:
+        mtime = pointer.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _lock:
+        if _manifest is not None and _manifest[0] == mtime:
+            return _manifest[1]
+    try:
+        version = pointer.read_text().strip()
+        manifest = json.loads((SNAPSHOT_DIR / version / "manifest.json").read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    with _lock:
+        _manifest = (mtime, manifest)
+        # Payloads of older versions are no longer served
+        for key in [k for k in _payloads if k[0] != version]:
+            del _payloads[key]
+    return manifest
+
+
+def _decode(layout, directory):
+    kind = layout["type"]
+    if kind == "none":
+        return None
+    if kind == "tuple":
+        return tuple(_decode(item, directory) for item in layout["items"])
+    if kind == "value":
+        return layout["value"]
+    if kind == "table":
+        return pd.read_parquet(directory / layout["file"])
+    if kind == "figure":
+        return pio.from_json((directory / layout["file"]).read_text(), skip_invalid=True)
+    raise ValueError(f"unknown payload type {kind!r}")
+
+
+def lookup(title, values):
+    """
+    Returns (payload, created_at) for a section from the latest snapshot, or None
+    when there is none, it is older than MAX_AGE or was built for other control values.
+    """
+    manifest = current()
+    if manifest is None or time.time() - manifest["created_at"] > MAX_AGE:
+        return None
+    entry = manifest["sections"].get(title)
+    if entry is None or entry["inputs"] != _jsonable(values):
+        return None
+
+    key = (manifest["version"], title)
+    with _lock:
+        if key in _payloads:
+            return _payloads[key], manifest["created_at"]
+    try:
+        payload = _decode(entry["payload"], SNAPSHOT_DIR / manifest["version"])
+    except FileNotFoundError:
+        # Pruned by a newer build in the meantime
+        return None
+    with _lock:
+        _payloads[key] = payload
+    return payload, manifest["created_at"]
+
+
+# --- CLI ---
+
+def parse_interval(text):
+    """
+    Seconds in "900", "90s", "15m", "2h".
+    """
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid interval {text!r}")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--every", type=parse_interval, metavar="INTERVAL", help="rebuild on this interval, e.g. 15m")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="versions kept on disk")
+    args = parser.parse_args()
+
+    import cache
+    from cache_backends import MemoryBackend
+
+    # The builder always fetches for itself; it never touches a shared cache
+    cache.configure(MemoryBackend())
+
+    while True:
+        started = time.time()
+        manifest = build(args.keep)
+        for title, entry in manifest["sections"].items():
+            print(f"ok     {title:<20} {entry['seconds']:7.2f} s")
+        for title, error in manifest["errors"].items():
+            print(f"error  {title:<20} {error}")
+        print(f"snapshot {manifest['version']} in {SNAPSHOT_DIR}")
+
+        if not args.every:
+            return 1 if manifest["errors"] else 0
+        # Next build fetches again: cached values are dropped, the on-disk stores keep history
+        time.sleep(max(args.every - (time.time() - started), 0))
+        for namespace in cache.namespaces():
+            cache.evict(namespace)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
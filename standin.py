@@ -0,0 +1,357 @@
+"""
+Local stand-in for the FRED and Yahoo APIs.
+
+Serves the responses recorded with MACRO_PROVIDER_MODE=record, with optional
+latency and error injection, so the dashboard and the data.py loaders can run
+offline and slow-provider / rate-limit scenarios are reproducible:
+
+    python standin.py --fixtures fixtures --latency 0.3 --error-rate 0.1 --error-status 429
+    python standin.py --synthetic       # generated data, no recordings needed
+    MACRO_PROVIDER_MODE=replay MACRO_STORE_DIR=/tmp/replay-store streamlit run app.py
+"""
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from providers import fixture_key, fixture_params
+
+# Parameters that only move the requested date window. If nothing was recorded for
+# the exact request, a recording that differs only in these is served instead,
+# trimmed to the requested start date.
+WINDOW_PARAMS = {"observation_start", "realtime_start", "realtime_end", "start", "end", "period"}
+
+
+class FixtureStore:
+    """
+    Index of the recorded responses in a fixture directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.meta = {}
+        for path in self.directory.glob("*.meta.json"):
+            self.meta[path.name[:-len(".meta.json")]] = json.loads(path.read_text())
+
+    def lookup(self, source, name, params):
+        """
+        Returns (body, content type) for a request, or None if nothing matches.
+        """
+        meta = self.meta.get(fixture_key(source, name, params)) or self._closest(source, name, params)
+        if meta is None:
+            return None
+
+        body = (self.directory / meta["file"]).read_bytes()
+        if source == "fred":
+            return self._trim_observations(meta, body, params), "application/json"
+        return self._trim_frame(meta, body, params), "application/octet-stream"
+
+    def _closest(self, source, name, params):
+        def identity(p):
+            return {k: v for k, v in p.items() if k not in WINDOW_PARAMS}
+
+        wanted = identity(params)
+        candidates = [
+            m for m in self.meta.values()
+            if m["source"] == source and m["name"] == name and identity(m["params"]) == wanted
+        ]
+        # Prefer full-history recordings, then the most recent one
+        candidates.sort(key=lambda m: (
+            "observation_start" in m["params"] or "start" in m["params"],
+            -m["recorded_at"],
+        ))
+        return candidates[0] if candidates else None
+
+    @staticmethod
+    def _trim_observations(meta, body, params):
+        start = params.get("observation_start")
+        if not start or meta["params"].get("observation_start") == start:
+            return body
+
+        data = json.loads(body)
+        if "observations" in data:
+            data["observations"] = [o for o in data["observations"] if o["date"] >= start]
+            data["count"] = len(data["observations"])
+        return json.dumps(data).encode()
+
+    @staticmethod
+    def _trim_frame(meta, body, params):
+        start = params.get("start")
+        if not start or meta["params"].get("start") == start:
+            return body
+
+        df = pd.read_parquet(io.BytesIO(body))
+        buffer = io.BytesIO()
+        df[df.index >= start].to_parquet(buffer)
+        return buffer.getvalue()
+
+
+class SyntheticStore:
+    """
+    Generated responses for every route the loaders use, so the dashboard and
+    bench.py run on a clean checkout without recorded fixtures. Each series is
+    seeded from its request, so repeated requests get identical data.
+    """
+    meta = {}
+
+    # First observation of the generated FRED series
+    HISTORY_START = "2015-01-01"
+
+    # Calendar releases generated per business day
+    RELEASES = [
+        "Consumer Price Index", "Employment Situation", "Retail and Food Services",
+        "Industrial Production", "New Residential Construction", "Gross Domestic Product",
+        "Producer Price Index", "H.8 Assets and Liabilities of Commercial Banks",
+    ]
+
+    SECTORS = ["Technology", "Financial Services", "Healthcare", "Industrials", "Energy", "Consumer Cyclical"]
+
+    def lookup(self, source, name, params):
+        route = {
+            ("fred", "series/observations"): self._observations,
+            ("fred", "releases/dates"): self._release_dates,
+            ("yahoo", "download"): self._download,
+            ("yahoo", "earnings"): self._earnings,
+            ("yahoo", "profile"): self._profile,
+        }.get((source, name))
+        if route is None:
+            return None
+        body = route(params)
+        if isinstance(body, pd.DataFrame):
+            buffer = io.BytesIO()
+            body.to_parquet(buffer)
+            return buffer.getvalue(), "application/octet-stream"
+        return json.dumps(body).encode(), "application/json"
+
+    @staticmethod
+    def _rng(*key):
+        return np.random.default_rng(zlib.crc32(repr(key).encode()))
+
+    @staticmethod
+    def _today():
+        return pd.Timestamp.today().normalize()
+
+    def _walk(self, key, days, level, step):
+        return level + np.cumsum(self._rng(key).normal(0, step, len(days)))
+
+    def _observations(self, params):
+        series_id = params["series_id"]
+        days = pd.bdate_range(self.HISTORY_START, self._today())
+        level, step = (4.0, 0.3) if series_id.startswith("BAMLH") else (1.2, 0.03) if series_id.startswith("BAML") else (3.0, 0.05)
+        values = np.abs(self._walk(series_id, days, level, step))
+        # FRED has no print on market holidays ("." rows)
+        holidays = (days.month == 1) & (days.day == 1) | (days.month == 7) & (days.day == 4) | (days.month == 12) & (days.day == 25)
+        rows = [
+            {"date": f"{day:%Y-%m-%d}", "value": "." if closed else f"{value:.2f}"}
+            for day, value, closed in zip(days, values, holidays)
+            if day >= pd.Timestamp(params.get("observation_start", self.HISTORY_START))
+        ]
+        return {"count": len(rows), "observations": rows}
+
+    def _release_dates(self, params):
+        days = pd.bdate_range(params["realtime_start"], params["realtime_end"])
+        rows = []
+        for day in days:
+            for release_id in self._rng("releases", f"{day:%Y-%m-%d}").choice(len(self.RELEASES), 2, replace=False):
+                rows.append({"release_id": int(release_id), "release_name": self.RELEASES[release_id], "date": f"{day:%Y-%m-%d}"})
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 1000))
+        return {"count": len(rows), "release_dates": rows[offset:offset + limit]}
+
+    def _download(self, params):
+        tickers = json.loads(params["tickers"])
+        today = self._today()
+        if "start" in params:
+            start = pd.Timestamp(params["start"])
+        else:
+            start = today - {"5d": pd.Timedelta(days=7), "1y": pd.DateOffset(years=1)}.get(params.get("period"), pd.DateOffset(years=1))
+        # The walk always starts a year back, so overlapping requests agree
+        days = pd.bdate_range(today - pd.DateOffset(years=1), today, name="Date")
+
+        frames = {}
+        for ticker in tickers:
+            if ticker.startswith("ZQ"):
+                close = 100 - np.abs(self._walk(ticker, days, 4.0, 0.01))
+            else:
+                close = 100 * np.exp(self._walk(ticker, days, 0, 0.01))
+            spread = np.abs(self._rng(ticker, "range").normal(0, 0.005, len(days))) * close
+            frames[ticker] = pd.DataFrame({
+                "Open": close - spread / 2, "High": close + spread, "Low": close - spread,
+                "Close": close, "Adj Close": close, "Volume": 1e6,
+            }, index=days)
+
+        df = pd.concat(frames, axis=1, names=["Ticker", "Price"])
+        df = df[df.index >= start]
+        if params.get("group_by") != "ticker":
+            df = df.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        return df
+
+    def _earnings(self, params):
+        today = self._today()
+        events = []
+        for day in pd.bdate_range(params["start"], params["end"]):
+            rng = self._rng("earnings", f"{day:%Y-%m-%d}")
+            for i in range(int(rng.integers(5, 150))):
+                estimate = round(rng.normal(1, 0.8), 2)
+                reported = round(estimate + rng.normal(0.05, 0.2), 2) if day < today else np.nan
+                events.append({
+                    "Symbol": f"S{day:%m%d}{i:03d}",
+                    "Company": f"Company {day:%m%d}-{i}",
+                    "Marketcap": float(10 ** rng.uniform(8, 12)),
+                    "Event Name": "Q3 2026 Earnings Call",
+                    "Event Start Date": (day + pd.Timedelta(hours=8 if i % 2 else 21)).tz_localize("UTC"),
+                    "Timing": "BMO" if i % 2 else "AMC",
+                    "EPS Estimate": estimate,
+                    "Reported EPS": reported,
+                    "Surprise(%)": round(100 * (reported / estimate - 1), 2) if estimate else np.nan,
+                })
+        df = pd.DataFrame(events)
+        if df.empty:
+            return df
+        df = df[df["Marketcap"] >= float(params.get("market_cap", 0))]
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 100))
+        return df.iloc[offset:offset + limit].set_index("Symbol")
+
+    def _profile(self, params):
+        symbol = params["symbol"]
+        sector = self.SECTORS[zlib.crc32(symbol.encode()) % len(self.SECTORS)]
+        return pd.DataFrame([{"Symbol": symbol, "Sector": sector, "Industry": sector}])
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    HTTP server holding the fixtures (generated ones when `fixtures` is None) and
+    the latency / error injection settings. Injection is driven by a seeded RNG,
+    so a given request sequence is reproducible.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, fixtures, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=429, route_latency=None, seed=0, verbose=False):
+        super().__init__(address, _Handler)
+        self.fixtures = SyntheticStore() if fixtures is None else FixtureStore(fixtures)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.route_latency = route_latency or {}
+        self.verbose = verbose
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def delay_for(self, path):
+        delay = self.latency
+        for prefix, seconds in self.route_latency.items():
+            if path.startswith(prefix):
+                delay = seconds
+        with self._rng_lock:
+            return delay + self._rng.uniform(0, self.jitter)
+
+    def should_fail(self):
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+        parts = url.path.strip("/").split("/", 1)
+        if len(parts) != 2 or parts[0] not in ("fred", "yahoo"):
+            return self._send(404, {"error_message": f"Unknown route {url.path}"})
+
+        source, name = parts
+        if source == "yahoo":
+            params = json.loads(query.get("params", "{}"))
+        else:
+            params = fixture_params(query)
+
+        time.sleep(self.server.delay_for("/" + url.path.strip("/")))
+
+        if self.server.should_fail():
+            return self._send(self.server.error_status, {"error_message": "Injected error"})
+
+        found = self.server.fixtures.lookup(source, name, params)
+        if found is None:
+            return self._send(404, {"error_message": f"No fixture for {source}/{name} {params}"})
+
+        body, content_type = found
+        self._send(200, body, content_type)
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_standin(fixtures, port=0, **options):
+    """
+    Starts a stand-in server on a background thread.
+    Returns (server, base_url); call server.shutdown() to stop it.
+    """
+    server = StandInServer(("127.0.0.1", port), fixtures, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def _parse_route_latency(values):
+    routes = {}
+    for value in values:
+        prefix, _, seconds = value.partition("=")
+        routes["/" + prefix.strip("/")] = float(seconds)
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the FRED and Yahoo APIs.")
+    parser.add_argument("--fixtures", default="fixtures", help="directory of recorded responses")
+    parser.add_argument("--synthetic", action="store_true", help="serve generated data instead of fixtures")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random delay (seconds)")
+    parser.add_argument("--route-latency", action="append", default=[], metavar="PREFIX=SECONDS",
+                        help="latency override for a route prefix, e.g. yahoo/download=5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429, help="HTTP status for injected errors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = StandInServer(
+        ("127.0.0.1", args.port),
+        None if args.synthetic else args.fixtures,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        route_latency=_parse_route_latency(args.route_latency),
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+    source = "generated data" if args.synthetic else f"{len(server.fixtures.meta)} fixtures from {args.fixtures}"
+    print(f"Serving {source} on http://127.0.0.1:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
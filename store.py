@@ -0,0 +1,83 @@
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+# Root of the local data store. Override with MACRO_STORE_DIR (e.g. a mounted volume).
+STORE_DIR = Path(os.environ.get("MACRO_STORE_DIR", ".store"))
+FRED_DIR = STORE_DIR / "fred"
+
+# FRED occasionally revises the most recent observations, so every refresh
+# re-requests a few days behind the last stored date and overwrites them.
+REVISION_OVERLAP_DAYS = 7
+
+
+def _series_path(series_id):
+    return FRED_DIR / f"{series_id}.parquet"
+
+
+def write_frame(df, path, **kwargs):
+    """
+    Writes a DataFrame to Parquet atomically (temp file + rename), so readers
+    in other threads or processes never see a half-written file. Keyword
+    arguments go to DataFrame.to_parquet.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    df.to_parquet(tmp, **kwargs)
+    os.replace(tmp, path)
+
+
+def read_series(series_id):
+    """
+    Returns the locally stored observations for a FRED series
+    (empty Series if nothing has been stored yet).
+    """
+    path = _series_path(series_id)
+    if not path.exists():
+        return pd.Series(dtype="float64", name=series_id)
+
+    df = pd.read_parquet(path)
+    return df["value"].rename(series_id)
+
+
+def write_series(series_id, series):
+    frame = series.rename("value").to_frame()
+    frame.index.name = "date"
+    write_frame(frame, _series_path(series_id))
+
+
+def update_series(fred, series_id):
+    """
+    Brings the local copy of a FRED series up to date and returns the full history.
+
+    Only observations from (last stored date - REVISION_OVERLAP_DAYS) onwards are
+    requested; older history is served from disk.
+    """
+    stored = read_series(series_id)
+
+    if stored.empty:
+        start = None
+        fresh = fred.get_series(series_id)
+    else:
+        start = stored.index[-1] - pd.Timedelta(days=REVISION_OVERLAP_DAYS)
+        fresh = fred.get_series(series_id, observation_start=start.strftime("%Y-%m-%d"))
+
+    if fresh is None or fresh.empty:
+        return stored
+
+    fresh = fresh.astype("float64")
+    fresh.index = pd.to_datetime(fresh.index)
+
+    if start is None:
+        combined = fresh
+    else:
+        combined = pd.concat([stored[stored.index < start], fresh])
+    combined = combined.rename(series_id)
+
+    if not combined.equals(stored):
+        write_series(series_id, combined)
+
+    return combined
@@ -0,0 +1,291 @@
+"""
+Hot-path instrumentation for the data.py loaders and plots.py builders.
+
+Every instrumented call records a span: wall time, cache status, bytes fetched
+from providers, rows returned, time spent in named phases (e.g. figure
+serialization) and provider errors. Spans are kept in a bounded in-memory
+buffer, emitted as JSON log records on the "macro_dashboard.telemetry" logger,
+and aggregated for the sidebar diagnostics panel and a Prometheus text dump
+(also written to MACRO_METRICS_FILE for a node_exporter textfile collector).
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("macro_dashboard.telemetry")
+
+METRICS_FILE = os.environ.get("MACRO_METRICS_FILE")
+METRICS_FILE_INTERVAL = 15.0
+
+_current = contextvars.ContextVar("telemetry_span", default=None)
+
+_events = deque(maxlen=500)
+_stats = {}            # name -> aggregate dict
+_provider_errors = {}  # source -> count
+_lock = threading.Lock()
+_last_write = [0.0]
+
+
+class Span:
+    __slots__ = ("name", "kind", "started", "wall_s", "cache", "bytes", "rows", "phases", "errors", "_lock")
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.started = time.time()
+        self.wall_s = 0.0
+        self.cache = None
+        self.bytes = 0
+        self.rows = None
+        self.phases = {}
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "started": self.started,
+            "wall_s": round(self.wall_s, 6),
+            "cache": self.cache,
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "phases": {k: round(v, 6) for k, v in self.phases.items()},
+            "errors": self.errors,
+        }
+
+
+def _rows(result):
+    if hasattr(result, "shape") and hasattr(result, "__len__"):
+        return len(result)
+    return None
+
+
+@contextmanager
+def span(name, kind):
+    """
+    Records everything that happens inside the block as one span.
+    """
+    current = Span(name, kind)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.errors.append(repr(e))
+        raise
+    finally:
+        current.wall_s = time.perf_counter() - start
+        _current.reset(token)
+        _finish(current)
+
+
+def instrument(kind):
+    """
+    Decorator recording a span per call; kind is "loader" or "plot".
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(func.__qualname__, kind) as current:
+                result = func(*args, **kwargs)
+                current.rows = _rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def phase(name):
+    """
+    Adds the block's wall time to a named phase of the current span.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current = _current.get()
+        if current is not None:
+            with current._lock:
+                current.phases[name] = current.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_cache(status):
+    """
+    status: "hit", "stale" (served while refreshing) or "miss".
+    """
+    current = _current.get()
+    if current is not None and current.cache is None:
+        current.cache = status
+
+
+def record_bytes(n):
+    current = _current.get()
+    if current is not None:
+        with current._lock:
+            current.bytes += n
+
+
+def record_error(source, exc):
+    """
+    Records a provider error that the caller handled (e.g. by returning an empty frame).
+    """
+    with _lock:
+        _provider_errors[source] = _provider_errors.get(source, 0) + 1
+    current = _current.get()
+    if current is not None:
+        with current._lock:
+            current.errors.append(f"{source}: {exc!r}")
+    logger.warning(json.dumps({"event": "provider_error", "source": source, "error": repr(exc)}))
+
+
+def _finish(current):
+    event = current.as_dict()
+    with _lock:
+        _events.append(event)
+        stats = _stats.setdefault(current.name, {
+            "name": current.name,
+            "kind": current.kind,
+            "calls": 0,
+            "hit": 0,
+            "stale": 0,
+            "miss": 0,
+            "errors": 0,
+            "wall_s_sum": 0.0,
+            "wall_s_max": 0.0,
+            "bytes": 0,
+            "rows": None,
+            "phases": {},
+        })
+        stats["calls"] += 1
+        if current.cache in ("hit", "stale", "miss"):
+            stats[current.cache] += 1
+        stats["errors"] += len(current.errors)
+        stats["wall_s_sum"] += current.wall_s
+        stats["wall_s_max"] = max(stats["wall_s_max"], current.wall_s)
+        stats["bytes"] += current.bytes
+        if current.rows is not None:
+            stats["rows"] = current.rows
+        for name, seconds in current.phases.items():
+            stats["phases"][name] = stats["phases"].get(name, 0.0) + seconds
+
+    logger.info(json.dumps({"event": "span", **event}))
+    _maybe_write_metrics_file()
+
+
+# --- Export ---
+
+def recent_events():
+    with _lock:
+        return list(_events)
+
+
+def summary():
+    """
+    One row per instrumented function, for the diagnostics panel.
+    """
+    with _lock:
+        rows = []
+        for s in _stats.values():
+            rows.append({
+                "name": s["name"],
+                "kind": s["kind"],
+                "calls": s["calls"],
+                "hit / stale / miss": f"{s['hit']} / {s['stale']} / {s['miss']}",
+                "mean ms": 1000 * s["wall_s_sum"] / s["calls"],
+                "max ms": 1000 * s["wall_s_max"],
+                "KB fetched": s["bytes"] / 1024,
+                "rows": s["rows"],
+                "errors": s["errors"],
+            })
+        return rows
+
+
+def provider_errors():
+    with _lock:
+        return dict(_provider_errors)
+
+
+def to_jsonl():
+    """
+    Recent spans as JSON lines.
+    """
+    return "\n".join(json.dumps(e) for e in recent_events())
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus():
+    """
+    Prometheus text exposition format dump of the aggregates.
+    """
+    with _lock:
+        stats = [dict(s, phases=dict(s["phases"])) for s in _stats.values()]
+        errors = dict(_provider_errors)
+
+    lines = [
+        "# HELP macro_calls_total Instrumented calls by cache status.",
+        "# TYPE macro_calls_total counter",
+    ]
+    for s in stats:
+        labels = f'name="{_label(s["name"])}",kind="{s["kind"]}"'
+        for status in ("hit", "stale", "miss"):
+            lines.append(f'macro_calls_total{{{labels},cache="{status}"}} {s[status]}')
+        uncached = s["calls"] - s["hit"] - s["stale"] - s["miss"]
+        lines.append(f'macro_calls_total{{{labels},cache="none"}} {uncached}')
+
+    lines += ["# HELP macro_wall_seconds Wall time of instrumented calls.", "# TYPE macro_wall_seconds summary"]
+    for s in stats:
+        labels = f'name="{_label(s["name"])}",kind="{s["kind"]}"'
+        lines.append(f"macro_wall_seconds_sum{{{labels}}} {s['wall_s_sum']:.6f}")
+        lines.append(f"macro_wall_seconds_count{{{labels}}} {s['calls']}")
+
+    lines += ["# HELP macro_phase_seconds_total Time spent in named phases.", "# TYPE macro_phase_seconds_total counter"]
+    for s in stats:
+        for phase_name, seconds in s["phases"].items():
+            lines.append(f'macro_phase_seconds_total{{name="{_label(s["name"])}",phase="{phase_name}"}} {seconds:.6f}')
+
+    lines += ["# HELP macro_fetched_bytes_total Bytes fetched from providers.", "# TYPE macro_fetched_bytes_total counter"]
+    for s in stats:
+        lines.append(f'macro_fetched_bytes_total{{name="{_label(s["name"])}"}} {s["bytes"]}')
+
+    lines += ["# HELP macro_rows Rows returned by the last call.", "# TYPE macro_rows gauge"]
+    for s in stats:
+        if s["rows"] is not None:
+            lines.append(f'macro_rows{{name="{_label(s["name"])}"}} {s["rows"]}')
+
+    lines += ["# HELP macro_provider_errors_total Handled provider errors.", "# TYPE macro_provider_errors_total counter"]
+    for source, count in errors.items():
+        lines.append(f'macro_provider_errors_total{{source="{_label(source)}"}} {count}')
+
+    return "\n".join(lines) + "\n"
+
+
+def _maybe_write_metrics_file():
+    if not METRICS_FILE:
+        return
+    now = time.time()
+    with _lock:
+        if now - _last_write[0] < METRICS_FILE_INTERVAL:
+            return
+        _last_write[0] = now
+
+    tmp = f"{METRICS_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(to_prometheus())
+    os.replace(tmp, METRICS_FILE)
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _stats.clear()
+        _provider_errors.clear()